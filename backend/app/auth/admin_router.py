@@ -1,62 +1,139 @@
 
-from fastapi import APIRouter, HTTPException, status
+import asyncio
+import csv
+import io
+import logging
+
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from app.config import settings
-from typing import List
+from typing import List, Optional
 from app.auth.utils import (
-    verify_superuser,
-    verify_membership_exists
+    verify_membership_exists,
+    revoke_user_sessions,
+    verify_can_manage_user,
+    get_membership_details,
+    build_status_update
+)
+from app.catalog import membership_catalog
+from app.responses import orjson_default, trusted_response
+from app.dependencies import (
+    DatabaseDepends,
+    SuperUser,
+    UserViewer,
+    UserManager,
+    MembershipManager,
+    AnyAdmin,
+    invalidate_principals,
+    invalidate_principals_where,
+    revocations
 )
-from app.dependencies import DatabaseDepends, CurrentUser
 from app.models.models import (
     AdminUserList,
     AdminUpdateUserStatus,
     AdminUpdateUserResponse,
+    AdminBulkUpdateUserStatus,
+    AdminBulkUpdateUserStatusResponse,
+    AdminRevokeSessionsResponse,
+    AdminSetUserRoles,
+    AdminSetUserRolesResponse,
     SetProfile,
     MembershipCreateRequest,
     MembershipUpdateRequest,
     MembershipResponse,
     UserSubscriptionRequest,
-    UserSubscriptionResponse
+    UserSubscriptionResponse,
+    BulkSubscriptionRequest,
+    BulkSubscriptionItemResult,
+    BulkSubscriptionResponse,
+    MembershipStatusEnum,
+    MemberSearchResult,
+    ExportFormatEnum,
+    ExportWatermarkEnum
 )
 from datetime import datetime, timedelta
 from app.utils import (
     get_password_hash,
     create_token,
     verify_password,
-    validate_refresh_token,
-    decode_token
+    decode_token,
+    encode_cursor,
+    decode_cursor,
+    normalize_search_term,
+    build_search_branches
 )
 from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+ADMIN_USER_LIST_PROJECTION = {
+    "email": 1,
+    "is_active": 1,
+    "profile": 1,
+}
+
 @router.get("/users", response_model=List[AdminUserList])
 async def get_user_list(
+    response: Response,
     db: DatabaseDepends,
-    current_user: CurrentUser 
+    current_user: UserViewer,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    membership_status: Optional[MembershipStatusEnum] = None
 ) -> AdminUserList:
     """
-    Get the list of all users, restricted to superusers.
+    Get a page of users, for user viewers, user managers and superusers.
+
+    Pages are keyed on ``_id``; pass the ``X-Next-Cursor`` response header
+    back as ``cursor`` to fetch the next page. The header is absent on the
+    last page.
     """
     try:
-        await verify_superuser(db, current_user)
+        id_condition = {"$ne": ObjectId(current_user["_id"])}
+        if cursor:
+            id_condition["$gt"] = decode_cursor(cursor)
+        query = {"_id": id_condition}
+        if is_active is not None:
+            query["is_active"] = is_active
+        if is_verified is not None:
+            query["is_verified"] = is_verified
+        if membership_status == MembershipStatusEnum.ACTIVE:
+            query["membership.end_date"] = {"$gt": datetime.utcnow()}
+        elif membership_status == MembershipStatusEnum.EXPIRED:
+            query["membership.end_date"] = {"$lte": datetime.utcnow()}
+        elif membership_status == MembershipStatusEnum.NONE:
+            query["membership"] = None
 
         users = await db.users.find(
-        {"_id": {"$ne": ObjectId(current_user["_id"])}}).to_list(100)
-        user_list = [
-            {
+            query, ADMIN_USER_LIST_PROJECTION
+        ).sort("_id", 1).limit(limit + 1).to_list(limit + 1)
+
+        headers = {}
+        if len(users) > limit:
+            users = users[:limit]
+            headers["X-Next-Cursor"] = encode_cursor(users[-1]["_id"])
+        response.headers.update(headers)
+
+        user_list = []
+        for user in users:
+            profile = user.get("profile") or {}
+            user_list.append({
                 "_id": str(user["_id"]),
-                "first_name": user.get("profile").get("first_name"),
-                "last_name": user.get("profile").get("last_name"),
+                "first_name": profile.get("first_name"),
+                "last_name": profile.get("last_name"),
                 "is_active": user.get("is_active"),
                 "email": user.get("email", ""),
-                "is_superuser": user.get("is_superuser", False),
                 "profile": user.get("profile")
-            }
-            for user in users
-        ]
+            })
 
-        return user_list
+        return trusted_response(user_list, headers=headers)
     except HTTPException as http_err:
         raise http_err
     except Exception as e:
@@ -65,38 +142,215 @@ async def get_user_list(
             detail="Error"
         )
 
+SEARCH_PROJECTION = {
+    "email": 1,
+    "is_active": 1,
+    "profile.first_name": 1,
+    "profile.last_name": 1,
+    "search": 1,
+}
+
+def _search_score(search: dict, terms: List[str]) -> int:
+    """
+    Rank a candidate: exact matches beat prefix matches, email beats names,
+    and a "first last" query matching both names beats either alone.
+    """
+    query = " ".join(terms)
+    email = search.get("email", "")
+    first_name = search.get("first_name", "")
+    last_name = search.get("last_name", "")
+    score = 0
+    if email == query:
+        score += 100
+    elif email.startswith(query):
+        score += 50
+    if len(terms) > 1 and first_name == terms[0] and last_name.startswith(terms[1]):
+        score += 80
+    for name in (first_name, last_name):
+        if name == terms[0]:
+            score += 40
+        elif name.startswith(terms[0]):
+            score += 20
+    return score
+
+@router.get("/users/search", response_model=List[MemberSearchResult])
+async def search_users(
+    db: DatabaseDepends,
+    current_user: UserViewer,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Admin-only typeahead search over member email and first/last name.
+
+    Every branch is an exact or anchored prefix match on a normalized
+    ``search`` field, so each is answered from its index; the merged
+    results are ranked by relevance.
+    """
+    try:
+        terms = normalize_search_term(q).split()
+        if not terms:
+            return []
+
+        # Exact and prefix branches are fetched separately, each in index
+        # order, so an exact hit is never crowded out by many prefix hits
+        batches = await asyncio.gather(*(
+            db.users.find(condition, SEARCH_PROJECTION)
+            .sort(index)
+            .hint(index)
+            .limit(limit)
+            .to_list(limit)
+            for condition, index in build_search_branches(terms)
+        ))
+        candidates = list({
+            user["_id"]: user for batch in batches for user in batch
+        }.values())
+
+        candidates.sort(
+            key=lambda user: (-_search_score(user.get("search", {}), terms), user["email"])
+        )
+        return [
+            MemberSearchResult(
+                id=str(user["_id"]),
+                email=user["email"],
+                first_name=(user.get("profile") or {}).get("first_name"),
+                last_name=(user.get("profile") or {}).get("last_name"),
+                is_active=user.get("is_active", False)
+            )
+            for user in candidates[:limit]
+        ]
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while searching users: {str(e)}"
+        )
+
+EXPORT_PROJECTION = {
+    "email": 1,
+    "is_active": 1,
+    "is_verified": 1,
+    "is_superuser": 1,
+    "profile": 1,
+    "membership": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
+EXPORT_CSV_COLUMNS = [
+    "id", "email", "is_active", "is_verified", "is_superuser",
+    "first_name", "last_name", "age", "gender", "height", "weight",
+    "target_weight", "gym_experience_level", "workout_frequency",
+    "fitness_goals", "preferred_workout_types",
+    "membership_id", "membership_start_date", "membership_end_date",
+    "created_at", "updated_at",
+]
+
+def _export_csv_row(user: dict) -> list:
+    profile = user.get("profile") or {}
+    membership = user.get("membership") or {}
+    row = {
+        "id": str(user["_id"]),
+        "email": user.get("email"),
+        "is_active": user.get("is_active"),
+        "is_verified": user.get("is_verified"),
+        "is_superuser": user.get("is_superuser"),
+        "membership_id": membership.get("membership_id"),
+        "membership_start_date": membership.get("start_date"),
+        "membership_end_date": membership.get("end_date"),
+        "created_at": user.get("created_at"),
+        "updated_at": user.get("updated_at"),
+    }
+    for column in EXPORT_CSV_COLUMNS:
+        if column not in row:
+            value = profile.get(column)
+            row[column] = ";".join(value) if isinstance(value, list) else value
+    return [
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in (row[column] for column in EXPORT_CSV_COLUMNS)
+    ]
+
+async def _stream_ndjson(cursor):
+    async for user in cursor:
+        user["id"] = str(user.pop("_id"))
+        yield orjson.dumps(user, default=orjson_default) + b"\n"
+
+async def _stream_csv(cursor):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_CSV_COLUMNS)
+    async for user in cursor:
+        writer.writerow(_export_csv_row(user))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+@router.get("/users/export")
+async def export_users(
+    db: DatabaseDepends,
+    current_user: UserViewer,
+    format: ExportFormatEnum = ExportFormatEnum.NDJSON,
+    since: Optional[datetime] = None,
+    watermark: ExportWatermarkEnum = ExportWatermarkEnum.UPDATED_AT
+):
+    """
+    Admin-only streaming export of the member roster with profile and
+    membership fields. Pass ``since`` to only export members whose
+    ``watermark`` field is newer, for incremental pulls.
+    """
+    try:
+        query = {}
+        if since is not None:
+            query[watermark.value] = {"$gt": since}
+
+        cursor = db.users.find(
+            query,
+            EXPORT_PROJECTION,
+            batch_size=settings.EXPORT_BATCH_SIZE
+        ).sort([(watermark.value, 1), ("_id", 1)])
+
+        if format == ExportFormatEnum.CSV:
+            return StreamingResponse(
+                _stream_csv(cursor),
+                media_type="text/csv",
+                headers={"Content-Disposition": "attachment; filename=members.csv"}
+            )
+        return StreamingResponse(
+            _stream_ndjson(cursor),
+            media_type="application/x-ndjson"
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while exporting users: {str(e)}"
+        )
+
 @router.get("/users/{user_id}", response_model=dict)
 async def get_user_details(
     user_id: str,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: UserViewer
 ) -> dict:
     """
     Admin-only API to fetch details of a specific user, including their profile and any active subscription.
     """
     try:
-        await verify_superuser(db, current_user)
-
-        # Fetch the user
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            {"profile": 1, "is_active": 1, "membership": 1}
+        )
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
 
-        subscription_details = None
-        if "membership" in user and user["membership"]:
-            membership_id = user["membership"].get("membership_id")
-            membership = await db.memberships.find_one({"_id": ObjectId(membership_id)})
-            if membership:
-                subscription_details = {
-                    "membership_name": membership["name"],
-                    "membership_description": membership["description"],
-                    "price": membership["price"],
-                    "start_date": user["membership"].get("start_date"),
-                    "end_date": user["membership"].get("end_date"),
-                }
+        subscription_details = get_membership_details(user.get("membership"))
 
         response = {
             "profile": user.get("profile", {}),
@@ -119,16 +373,15 @@ async def get_user_details(
 async def create_membership(
     membership_data: MembershipCreateRequest,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: MembershipManager
 ):
     """
     Admin-only API to create a new membership plan.
     """
     try:
-        await verify_superuser(db, current_user)
-
         membership_dict = membership_data.dict()
         result = await db.memberships.insert_one(membership_dict)
+        await membership_catalog.bump(db)
 
         return MembershipResponse(
             id=str(result.inserted_id),
@@ -148,14 +401,12 @@ async def update_membership(
     membership_id: str,
     update_data: MembershipUpdateRequest,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: MembershipManager
 ):
     """
     Admin-only API to update an existing membership plan.
     """
     try:
-        await verify_superuser(db, current_user)
-
         existing_membership = await verify_membership_exists(db, membership_id)
 
         updated_data = {k: v for k, v in update_data.dict().items() if v is not None}
@@ -163,6 +414,7 @@ async def update_membership(
             {"_id": ObjectId(membership_id)},
             {"$set": updated_data}
         )
+        await membership_catalog.bump(db)
 
         updated_membership = {**existing_membership, **updated_data}
         return MembershipResponse(
@@ -182,16 +434,16 @@ async def update_membership(
 async def delete_membership(
     membership_id: str,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: MembershipManager
 ):
     """
     Admin-only API to delete a membership plan.
     """
     try:
-        await verify_superuser(db, current_user)
         await verify_membership_exists(db, membership_id)
 
         await db.memberships.delete_one({"_id": ObjectId(membership_id)})
+        await membership_catalog.bump(db)
 
         return {"message": "Membership plan deleted successfully."}
 
@@ -207,16 +459,16 @@ async def delete_membership(
 async def delete_membership(
     membership_id: str,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: MembershipManager
 ):
     """
     Admin-only API to delete a membership plan.
     """
     try:
-        await verify_superuser(db, current_user)
         await verify_membership_exists(db, membership_id)
 
         await db.memberships.delete_one({"_id": ObjectId(membership_id)})
+        await membership_catalog.bump(db)
 
         return {"message": "Membership plan deleted successfully."}
 
@@ -232,21 +484,23 @@ async def delete_membership(
 @router.get("/memberships", response_model=list[MembershipResponse])
 async def list_memberships(
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: AnyAdmin
 ):
     """
     Admin-only API to fetch all membership plans.
     """
     try:
-        await verify_superuser(db, current_user)
-
-        memberships = await db.memberships.find().to_list(None)
-        return [
-            MembershipResponse(
-                id=str(membership["_id"]),
-                **membership
-            ) for membership in memberships
-        ]
+        memberships = membership_catalog.all()
+        return trusted_response([
+            {
+                "id": str(membership["_id"]),
+                "name": membership["name"],
+                "description": membership.get("description"),
+                "price": membership["price"],
+                "duration_months": membership["duration_months"],
+                "benefits": membership.get("benefits") or [],
+            } for membership in memberships
+        ])
 
     except HTTPException as e:
         raise e
@@ -262,14 +516,12 @@ async def subscribe_user_to_membership(
     user_id: str,
     subscription_data: UserSubscriptionRequest,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: MembershipManager
 ):
     """
     Admin-only API to subscribe a user to a membership plan.
     """
     try:
-        await verify_superuser(db, current_user)
-
         user = await db.users.find_one({"_id": ObjectId(user_id)})
         if not user:
             raise HTTPException(
@@ -289,9 +541,11 @@ async def subscribe_user_to_membership(
                     "membership_id": subscription_data.membership_id,
                     "start_date": start_date,
                     "end_date": end_date,
-                }
+                },
+                "updated_at": start_date
             }}
         )
+        await revocations.bump(db)
 
         return UserSubscriptionResponse(
             user_id=user_id,
@@ -309,12 +563,114 @@ async def subscribe_user_to_membership(
         )
 
 
+@router.post("/subscriptions/bulk", response_model=BulkSubscriptionResponse)
+async def bulk_subscribe_users(
+    subscription_data: BulkSubscriptionRequest,
+    db: DatabaseDepends,
+    current_user: MembershipManager
+):
+    """
+    Admin-only API to subscribe many users to membership plans at once.
+
+    User ids are checked with one ``$in`` query, plans come from the
+    catalog, and all updates go out in a single unordered ``bulk_write``.
+    Every item gets its own status in the report.
+    """
+    try:
+        results = [
+            BulkSubscriptionItemResult(
+                user_id=item.user_id,
+                membership_id=item.membership_id,
+                status="pending"
+            )
+            for item in subscription_data.items
+        ]
+
+        seen_user_ids = set()
+        for result in results:
+            if not ObjectId.is_valid(result.user_id):
+                result.status = "invalid_user_id"
+            elif not membership_catalog.get(result.membership_id):
+                result.status = "membership_not_found"
+            elif result.user_id in seen_user_ids:
+                result.status = "duplicate"
+            else:
+                seen_user_ids.add(result.user_id)
+
+        existing_user_ids = {
+            str(user["_id"])
+            for user in await db.users.find(
+                {"_id": {"$in": [ObjectId(user_id) for user_id in seen_user_ids]}},
+                {"_id": 1}
+            ).to_list(None)
+        }
+
+        start_date = datetime.utcnow()
+        operations = []
+        pending = []
+        for result in results:
+            if result.status != "pending":
+                continue
+            if result.user_id not in existing_user_ids:
+                result.status = "user_not_found"
+                continue
+            membership = membership_catalog.get(result.membership_id)
+            result.start_date = start_date
+            result.end_date = start_date + timedelta(days=membership["duration_months"] * 30)
+            operations.append(UpdateOne(
+                {"_id": ObjectId(result.user_id)},
+                {"$set": {
+                    "membership": {
+                        "membership_id": result.membership_id,
+                        "start_date": result.start_date,
+                        "end_date": result.end_date,
+                    },
+                    "updated_at": start_date
+                }}
+            ))
+            pending.append(result)
+
+        failed_indexes = set()
+        if operations:
+            try:
+                await db.users.bulk_write(operations, ordered=False)
+            except BulkWriteError as bulk_error:
+                failed_indexes = {
+                    error["index"] for error in bulk_error.details.get("writeErrors", [])
+                }
+
+        for index, result in enumerate(pending):
+            if index in failed_indexes:
+                result.status = "failed"
+                result.start_date = result.end_date = None
+            else:
+                result.status = "subscribed"
+
+        subscribed = sum(1 for result in results if result.status == "subscribed")
+        if subscribed:
+            await revocations.bump(db)
+        return BulkSubscriptionResponse(
+            requested=len(results),
+            subscribed=subscribed,
+            failed=len(results) - subscribed,
+            results=results
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while subscribing users: {str(e)}"
+        )
+
+
 @router.put("/users/{user_id}/status", response_model=AdminUpdateUserResponse)
 async def admin_update_user(
     user_id: str,
     update_data: AdminUpdateUserStatus,
     db: DatabaseDepends,
-    current_user: CurrentUser
+    current_user: UserManager
 ):
     """
     Admin-only API to update a user's active status.
@@ -326,9 +682,6 @@ async def admin_update_user(
     :return: Update confirmation response
     """
     try:
-        # Verify superuser privileges
-        await verify_superuser(db, current_user)
-
         # Validate ObjectId
         try:
             user_object_id = ObjectId(user_id)
@@ -337,27 +690,19 @@ async def admin_update_user(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid user ID format"
             )
+        await verify_can_manage_user(db, current_user, user_object_id)
 
-        # Check if user exists
-        user = await db.users.find_one({"_id": user_object_id})
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-
-        # Update user status
+        # Update user status; unchanged users keep their updated_at
         result = await db.users.update_one(
             {"_id": user_object_id},
-            {"$set": {"is_active": update_data.is_active}}
+            build_status_update(update_data.is_active)
         )
-
-        # Verify update was successful
-        if result.modified_count == 0:
+        if result.matched_count == 0:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Failed to update user status"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
             )
+        await revocations.bump(db)
 
         return AdminUpdateUserResponse(
             message="User's active status updated successfully",
@@ -369,9 +714,149 @@ async def admin_update_user(
         # Re-raise HTTP exceptions directly
         raise
     except Exception as e:
-        # Log unexpected errors
-        print(f"Unexpected error in admin_update_user: {e}")
+        logger.exception("Unexpected error in admin_update_user")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred"
-        )
\ No newline at end of file
+        )
+
+
+@router.put("/users/status", response_model=AdminBulkUpdateUserStatusResponse)
+async def admin_bulk_update_users(
+    update_data: AdminBulkUpdateUserStatus,
+    db: DatabaseDepends,
+    current_user: UserManager
+):
+    """
+    Admin-only API to activate or deactivate many users with one
+    ``update_many``, selected by id and/or by membership end date.
+    The calling admin and superusers are never included, nor are users
+    holding admin roles unless the caller is a superuser.
+    """
+    try:
+        query = {
+            "_id": {"$ne": ObjectId(current_user["_id"])},
+            "is_superuser": {"$ne": True},
+        }
+        if not current_user.get("is_superuser", False):
+            query["roles.0"] = {"$exists": False}
+        if update_data.user_ids is not None:
+            if not all(ObjectId.is_valid(user_id) for user_id in update_data.user_ids):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid user ID format"
+                )
+            query["_id"]["$in"] = [ObjectId(user_id) for user_id in update_data.user_ids]
+        if update_data.membership_ended_before is not None:
+            query["membership.end_date"] = {"$lt": update_data.membership_ended_before}
+
+        result = await db.users.update_many(
+            query,
+            build_status_update(update_data.is_active)
+        )
+
+        if update_data.user_ids is not None:
+            invalidated = invalidate_principals(update_data.user_ids)
+        else:
+            ended_before = update_data.membership_ended_before
+
+            def membership_ended(principal: dict) -> bool:
+                end_date = (principal.get("membership") or {}).get("end_date")
+                return end_date is not None and end_date < ended_before
+
+            invalidated = invalidate_principals_where(membership_ended)
+        # Other workers drop their cached principals as well
+        await revocations.bump(db)
+
+        return AdminBulkUpdateUserStatusResponse(
+            is_active=update_data.is_active,
+            matched_count=result.matched_count,
+            modified_count=result.modified_count,
+            invalidated_principals=invalidated
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while updating users: {str(e)}"
+        )
+
+
+@router.post("/users/{user_id}/revoke-sessions", response_model=AdminRevokeSessionsResponse)
+async def admin_revoke_user_sessions(
+    user_id: str,
+    db: DatabaseDepends,
+    current_user: UserManager
+):
+    """
+    Admin-only API to immediately invalidate every token issued to a user.
+    """
+    try:
+        if not ObjectId.is_valid(user_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID format"
+            )
+        await verify_can_manage_user(db, current_user, user_id)
+
+        token_version = await revoke_user_sessions(db, user_id)
+        if token_version is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+
+        return AdminRevokeSessionsResponse(
+            user_id=user_id,
+            token_version=token_version
+        )
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while revoking sessions: {str(e)}"
+        )
+
+
+@router.put("/users/{user_id}/roles", response_model=AdminSetUserRolesResponse)
+async def admin_set_user_roles(
+    user_id: str,
+    roles_data: AdminSetUserRoles,
+    db: DatabaseDepends,
+    current_user: SuperUser
+):
+    """
+    Superuser-only API to replace the admin roles granted to a user.
+    """
+    try:
+        if not ObjectId.is_valid(user_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID format"
+            )
+
+        roles = sorted({role.value for role in roles_data.roles})
+        result = await db.users.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": {"roles": roles, "updated_at": datetime.utcnow()}}
+        )
+        if result.matched_count == 0:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        await revocations.bump(db)
+
+        return AdminSetUserRolesResponse(user_id=user_id, roles=roles)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while updating roles: {str(e)}"
+        )
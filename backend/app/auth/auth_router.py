@@ -8,17 +8,24 @@ from app.auth.utils import (
     send_email,
     generate_otp,
     save_otp,
+    consume_otp,
     get_un_verfied_user_by_email,
     generate_reset_password_email,
-    get_user_from_token
+    get_user_from_token,
+    revoke_user_sessions,
+    create_session,
+    rotate_session,
+    get_membership_details
 )
-from app.dependencies import DatabaseDepends, CurrentUser
+from app.catalog import membership_catalog
+from app.ratelimit import rate_limiter
+from app.dependencies import DatabaseDepends, CurrentUser, ClientIpDepends, invalidate_principal
 from app.models.models import (
     RegisterUser,
     RegisterUserResponse,
     VerifyOtpRequest,
     VerifyOtpResponse,
-    OTP,
+    OTPTypeEnum,
     PasswordResetRequest,
     PasswordResetResponse,
     ResetPasswordRequest,
@@ -29,15 +36,16 @@ from app.models.models import (
     SetProfileResponse,
     RefreshTokenRequest,
     RefreshTokenResponse,
+    LogoutAllResponse,
     GetProfileResponse
 )
 from datetime import datetime, timedelta
 from app.utils import (
-    get_password_hash,
+    get_password_hash_async,
     create_token,
-    verify_password,
-    validate_refresh_token,
-    decode_token
+    verify_password_async,
+    decode_token,
+    normalize_search_term
 )
 from bson import ObjectId
 
@@ -78,40 +86,30 @@ async def register(
 @router.post("/verify-otp", response_model=VerifyOtpResponse)
 async def verify_otp(
     verify_otp_data: VerifyOtpRequest,
-    db: DatabaseDepends
+    db: DatabaseDepends,
+    client_ip: ClientIpDepends
 ) -> VerifyOtpResponse:
     try:
+        await rate_limiter.check(
+            "verify-otp",
+            ip=client_ip,
+            email=verify_otp_data.email,
+            ip_rate=settings.RATE_LIMIT_VERIFY_OTP_PER_IP,
+            email_rate=settings.RATE_LIMIT_VERIFY_OTP_PER_EMAIL
+        )
         user = await get_un_verfied_user_by_email(db, verify_otp_data.email)
 
         user_id = user["_id"]
-        otp_entry = await db.otps.find_one(
-            {"user_id": str(user_id), "otp": verify_otp_data.otp, "type": "Register"},
-            sort=[("created_at", -1)]
-        )
-
-        if not otp_entry:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid OTP."
-            )
-        if otp_entry["is_verified"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has already been verified."
-            )
-        if otp_entry["expires_at"] < datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has expired."
-            )
-        await db.otps.update_one(
-            {"_id": otp_entry["_id"]},
-            {"$set": {"is_verified": True}}
-        )
+        await consume_otp(db, user_id, OTPTypeEnum.REGISTER, verify_otp_data.otp)
         await db.users.update_one(
             {"_id": user_id},
-            {"$set": {"is_verified": True, "is_active": True}}
+            {"$set": {
+                "is_verified": True,
+                "is_active": True,
+                "updated_at": datetime.utcnow()
+            }}
         )
+        invalidate_principal(user_id)
 
         return VerifyOtpResponse(
             message="OTP successfully verified.",
@@ -129,9 +127,17 @@ async def verify_otp(
 @router.post("/request/password-reset", response_model=PasswordResetResponse)
 async def password_reset_request(
     request: PasswordResetRequest,
-    db: DatabaseDepends
+    db: DatabaseDepends,
+    client_ip: ClientIpDepends
 ) -> PasswordResetResponse:
     try:
+        await rate_limiter.check(
+            "password-reset",
+            ip=client_ip,
+            email=request.email,
+            ip_rate=settings.RATE_LIMIT_PASSWORD_RESET_PER_IP,
+            email_rate=settings.RATE_LIMIT_PASSWORD_RESET_PER_EMAIL
+        )
         user =  await db.users.find_one({
         "email": request.email
         })
@@ -147,23 +153,7 @@ async def password_reset_request(
             )
 
         otp = generate_otp(length=6)
-        expires_at = datetime.utcnow() + timedelta(minutes=10)
-
-        otp_data = OTP(
-            user_id=str(user["_id"]),
-            otp=otp,
-            type="ForgetPassword",
-            created_at=datetime.utcnow(),
-            expires_at=expires_at,
-            is_verified=False
-        )
-
-        result = await db.otps.insert_one(otp_data.dict(by_alias=True))
-        if not result.inserted_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Error saving OTP."
-            )
+        await save_otp(db, user["_id"], otp, otp_type=OTPTypeEnum.FORGET_PASSWORD)
 
         if settings.emails_enabled:
             email_content = generate_reset_password_email(
@@ -188,9 +178,17 @@ async def password_reset_request(
 @router.post("/set-password", response_model=ResetPasswordResponse)
 async def reset_password(
     reset_password_data: ResetPasswordRequest,
-    db: DatabaseDepends
+    db: DatabaseDepends,
+    client_ip: ClientIpDepends
 ) -> ResetPasswordResponse:
     try:
+        await rate_limiter.check(
+            "set-password",
+            ip=client_ip,
+            email=reset_password_data.email,
+            ip_rate=settings.RATE_LIMIT_SET_PASSWORD_PER_IP,
+            email_rate=settings.RATE_LIMIT_SET_PASSWORD_PER_EMAIL
+        )
         user =  await db.users.find_one({
         "email": reset_password_data.email
         })
@@ -204,43 +202,15 @@ async def reset_password(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="User is not verified."
             )
-        
-        otp_entry = await db.otps.find_one(
-            {"user_id": str(user["_id"]), "otp": reset_password_data.otp, "type": "ForgetPassword"},
-            sort=[("created_at", -1)]
-        )
-
-        if not otp_entry:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid OTP."
-            )
-
-        if otp_entry["is_verified"]:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has already been verified."
-            )
 
-        if otp_entry["expires_at"] < datetime.utcnow():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has expired."
-            )
-
-        await db.otps.update_one(
-            {"_id": otp_entry["_id"]},
-            {"$set": {"is_verified": True}}
-        )
+        await consume_otp(db, user["_id"], OTPTypeEnum.FORGET_PASSWORD, reset_password_data.otp)
 
-        hashed_password = get_password_hash(reset_password_data.new_password)
+        hashed_password = await get_password_hash_async(reset_password_data.new_password)
         await db.users.update_one(
             {"_id": user["_id"]},
             {"$set": {"hashed_password": hashed_password}}
         )
 
-        await db.otps.delete_one({"_id": otp_entry["_id"]})
-
         return ResetPasswordResponse(
             message="Password successfully reset."
         )
@@ -257,52 +227,30 @@ async def reset_password(
 @router.post("/login", response_model=LoginResponse)
 async def login(
     login_data: LoginRequest,
-    db: DatabaseDepends
+    db: DatabaseDepends,
+    client_ip: ClientIpDepends
 ) -> LoginResponse:
     try:
+        await rate_limiter.check(
+            "login",
+            ip=client_ip,
+            email=login_data.email,
+            ip_rate=settings.RATE_LIMIT_LOGIN_PER_IP,
+            email_rate=settings.RATE_LIMIT_LOGIN_PER_EMAIL
+        )
         user = await db.users.find_one({"email": login_data.email})
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
-        if not verify_password(login_data.password, user["hashed_password"]):
+        if not await verify_password_async(login_data.password, user["hashed_password"]):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
 
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
-        access_token = create_token(
-            subject=str(user["_id"]),
-            expires_delta=access_token_expires,
-            token_type="access_token",
-            email=user["email"]
-        )
-        refresh_token = create_token(
-            subject=str(user["_id"]),
-            expires_delta=refresh_token_expires,
-            token_type="refresh_token",
-            email=user["email"]
-        )
-        await db.tokens.insert_one({
-            "user_id": user["_id"],
-            "token": refresh_token,
-            "token_type": "refresh_token",
-            "expires": datetime.utcnow() + refresh_token_expires,
-            "created_at": datetime.utcnow(),
-            "is_blacklisted": False
-        })
-
-        await db.tokens.insert_one({
-            "user_id": user["_id"],
-            "token": access_token,
-            "token_type": "access_token",
-            "expires": datetime.utcnow() + access_token_expires,
-            "created_at": datetime.utcnow(),
-            "is_blacklisted": False
-        })
+        access_token, refresh_token = await create_session(db, user)
         if user.get("is_new", True):
             await db.users.update_one(
                 {"_id": user["_id"]},
@@ -341,8 +289,14 @@ async def set_profile(
         
         await db.users.update_one(
             {"_id": ObjectId(user_id)},
-            {"$set": {"profile": profile_dict}}
+            {"$set": {
+                "profile": profile_dict,
+                "search.first_name": normalize_search_term(profile_data.first_name),
+                "search.last_name": normalize_search_term(profile_data.last_name),
+                "updated_at": datetime.utcnow()
+            }}
         )
+        invalidate_principal(user_id)
 
         return SetProfileResponse(
             message="Profile updated successfully",
@@ -366,10 +320,10 @@ async def get_profile(
     API to retrieve the user's profile along with membership details.
     """
     try:
-        user_id = str(current_user["_id"])
-
-        # Fetch user from database
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
+        user = await db.users.find_one(
+            {"_id": current_user["_id"]},
+            {"profile": 1, "membership": 1}
+        )
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -377,19 +331,7 @@ async def get_profile(
             )
 
         user_profile = user.get("profile", {})
-
-        membership_details = None
-        if "membership" in user and user["membership"]:
-            membership_id = user["membership"].get("membership_id")
-            membership = await db.memberships.find_one({"_id": ObjectId(membership_id)})
-            if membership:
-                membership_details = {
-                    "membership_name": membership["name"],
-                    "membership_description": membership["description"],
-                    "price": membership["price"],
-                    "start_date": user["membership"].get("start_date"),
-                    "end_date": user["membership"].get("end_date"),
-                }
+        membership_details = get_membership_details(user.get("membership"))
 
         return GetProfileResponse(
             message="Profile retrieved successfully",
@@ -412,48 +354,10 @@ async def refresh_token(
     db: DatabaseDepends
 ) -> RefreshTokenResponse:
     try:
-        user = await validate_refresh_token(db, refresh_token_data.refresh_token)
-        
-        await db.tokens.update_one(
-            {"token": refresh_token_data.refresh_token},
-            {"$set": {"is_blacklisted": True}}
-        )
-        
-        access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
-        
-        new_access_token = create_token(
-            subject=str(user["_id"]),
-            expires_delta=access_token_expires,
-            token_type="access_token",
-            email=user["email"]
+        new_access_token, new_refresh_token = await rotate_session(
+            db, refresh_token_data.refresh_token
         )
-        
-        new_refresh_token = create_token(
-            subject=str(user["_id"]),
-            expires_delta=refresh_token_expires,
-            token_type="refresh_token",
-            email=user["email"]
-        )
-        
-        await db.tokens.insert_one({
-            "user_id": user["_id"],
-            "token": new_refresh_token,
-            "token_type": "refresh_token",
-            "expires": datetime.utcnow() + refresh_token_expires,
-            "created_at": datetime.utcnow(),
-            "is_blacklisted": False
-        })
-        
-        await db.tokens.insert_one({
-            "user_id": user["_id"],
-            "token": new_access_token,
-            "token_type": "access_token",
-            "expires": datetime.utcnow() + access_token_expires,
-            "created_at": datetime.utcnow(),
-            "is_blacklisted": False
-        })
-        
+
         return RefreshTokenResponse(
             access_token=new_access_token,
             refresh_token=new_refresh_token,
@@ -465,4 +369,25 @@ async def refresh_token(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"An error occurred during token refresh: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/logout-all", response_model=LogoutAllResponse)
+async def logout_all(
+    db: DatabaseDepends,
+    current_user: CurrentUser
+) -> LogoutAllResponse:
+    """
+    Sign the current user out everywhere by revoking all of their tokens.
+    """
+    try:
+        await revoke_user_sessions(db, current_user["_id"])
+        return LogoutAllResponse()
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred during logout: {str(e)}"
+        )
@@ -1,5 +1,7 @@
-import random
-import smtplib
+import hashlib
+import hmac
+import logging
+import secrets
 import string
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
@@ -7,12 +9,18 @@ from typing import Optional, Union
 
 from fastapi import HTTPException, status
 from bson import ObjectId
+from pymongo import ReturnDocument
+from app.catalog import membership_catalog
 from app.config import settings
-from app.models.models import PyObjectId, OTP
-from app.utils import create_token, get_password_hash, verify_password
+from app.dependencies import PRINCIPAL_PROJECTION, load_principal, revocations
+from app.mail import mail_transport
+from app.models.models import PyObjectId, OTP, OTPTypeEnum
+from app.utils import create_token, get_password_hash_async, build_search_fields
 from app.utils import EmailData, render_email_template
 from app.utils import decode_token
 
+logger = logging.getLogger(__name__)
+
 
 async def get_user_by_email(db, email: str) -> Optional[dict]:
     user =  await db.users.find_one({
@@ -39,46 +47,109 @@ async def get_un_verfied_user_by_email(db, email: str) -> Optional[dict]:
     return user
 
 def generate_otp(length: int = 6) -> str:
-    otp = ''.join(random.choices(string.digits, k=length))
+    otp = ''.join(secrets.choice(string.digits) for _ in range(length))
     return otp
 
-async def save_otp(db, user_id: Union[str, ObjectId], otp: str, expiration_minutes: int = 10) -> OTP:
+def hash_otp(user_id: ObjectId, otp_type: str, otp: str) -> str:
+    """Keyed digest of a code, bound to the user and purpose it was issued for."""
+    message = f"{user_id}:{otp_type}:{otp}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+async def save_otp(
+    db,
+    user_id: Union[str, ObjectId],
+    otp: str,
+    otp_type: OTPTypeEnum = OTPTypeEnum.REGISTER,
+    expiration_minutes: int = settings.OTP_EXPIRE_MINUTES
+) -> OTP:
+    """Store ``otp`` as the only active code of this type, replacing any earlier one."""
     if not isinstance(user_id, ObjectId):
         user_id = ObjectId(user_id)
-    
-    expires_at = datetime.utcnow() + timedelta(minutes=expiration_minutes)
 
+    now = datetime.utcnow()
     otp_data = OTP(
         user_id=user_id,
-        otp=otp,
-        type="Register",
-        created_at=datetime.utcnow(),
-        expires_at=expires_at,
+        otp_hash=hash_otp(user_id, otp_type.value, otp),
+        type=otp_type,
+        created_at=now,
+        expires_at=now + timedelta(minutes=expiration_minutes),
+        attempts=0,
         is_verified=False
     )
+    document = otp_data.model_dump(mode="python")
+    document["user_id"] = user_id
+    document["type"] = otp_type.value
 
-    result = await db.otps.insert_one(otp_data.dict(exclude_unset=True))
-
-
-    if result.inserted_id:
-        otp_data_dict = otp_data.dict()
-        otp_data_dict["_id"] = str(result.inserted_id)
-        return OTP(**otp_data_dict)
+    result = await db.otps.update_one(
+        {"user_id": user_id, "type": otp_type.value},
+        {"$set": document},
+        upsert=True
+    )
+    if result.acknowledged:
+        return otp_data
 
     raise HTTPException(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         detail="Error saving OTP"
     )
 
+async def consume_otp(db, user_id: ObjectId, otp_type: OTPTypeEnum, otp: str) -> None:
+    """
+    Mark the user's active code as used if ``otp`` matches it. A wrong guess
+    counts against the code, which stops working after OTP_MAX_ATTEMPTS.
+    """
+    now = datetime.utcnow()
+    key = {"user_id": user_id, "type": otp_type.value}
+    consumed = await db.otps.find_one_and_update(
+        {
+            **key,
+            "otp_hash": hash_otp(user_id, otp_type.value, otp),
+            "is_verified": False,
+            "expires_at": {"$gt": now},
+            "attempts": {"$lt": settings.OTP_MAX_ATTEMPTS}
+        },
+        {"$set": {"is_verified": True}},
+        projection={"_id": 1}
+    )
+    if consumed:
+        return
+
+    otp_entry = await db.otps.find_one_and_update(
+        key,
+        {"$inc": {"attempts": 1}},
+        projection={"otp_hash": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if not otp_entry:
+        detail = "Invalid OTP."
+    elif otp_entry["is_verified"]:
+        detail = "OTP has already been verified."
+    elif otp_entry["expires_at"] < now:
+        detail = "OTP has expired."
+    elif otp_entry["attempts"] > settings.OTP_MAX_ATTEMPTS:
+        detail = "Too many invalid attempts. Please request a new OTP."
+    else:
+        detail = "Invalid OTP."
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=detail
+    )
+
 async def register_user(db, user_payload: dict) -> dict:
     try:
+        hashed_password = await get_password_hash_async(user_payload["password"])
         user_data = {
             "email": user_payload["email"],
-            "hashed_password": get_password_hash(user_payload["password"]),
+            "hashed_password": hashed_password,
             "profile": {
                 "first_name": user_payload["first_name"],
                 "last_name": user_payload["last_name"]
             },
+            "search": build_search_fields(
+                user_payload["email"],
+                user_payload["first_name"],
+                user_payload["last_name"]
+            ),
             "is_active": False,
             "is_verified": False,
             "is_superuser": False,
@@ -135,9 +206,144 @@ def send_email(
     html_message["Subject"] = subject
     html_message["From"] = settings.EMAILS_FROM_EMAIL
     html_message["To"] = email_to
-    with smtplib.SMTP_SSL(settings.SMTP_HOST, 465) as server:
-        server.login(settings.EMAILS_FROM_EMAIL, settings.SMTP_PASSWORD)
-        server.sendmail(settings.EMAILS_FROM_EMAIL, email_to, html_message.as_string())
+    mail_transport.enqueue(html_message)
+
+def hash_refresh_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_session_tokens(
+    user_id: str,
+    email: str,
+    token_version: int,
+    session_id: str,
+    rotation: int
+) -> tuple[str, str]:
+    """
+    Create an access/refresh token pair bound to a session. The refresh
+    token also carries the session's rotation counter.
+    """
+    access_token = create_token(
+        subject=user_id,
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+        token_type="access_token",
+        email=email,
+        token_version=token_version,
+        extra_claims={"sid": session_id}
+    )
+    refresh_token = create_token(
+        subject=user_id,
+        expires_delta=timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+        token_type="refresh_token",
+        email=email,
+        token_version=token_version,
+        extra_claims={"sid": session_id, "rot": rotation}
+    )
+    return access_token, refresh_token
+
+
+async def create_session(db, user: dict) -> tuple[str, str]:
+    """
+    Start a session for a user with a single insert and return its tokens.
+    """
+    session_id = ObjectId()
+    access_token, refresh_token = issue_session_tokens(
+        str(user["_id"]),
+        user["email"],
+        user.get("token_version", 0),
+        str(session_id),
+        rotation=0
+    )
+    now = datetime.utcnow()
+    await db.sessions.insert_one({
+        "_id": session_id,
+        "user_id": user["_id"],
+        "refresh_hash": hash_refresh_token(refresh_token),
+        "rotation": 0,
+        "revoked": False,
+        "created_at": now,
+        "updated_at": now,
+        "expires": now + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+    })
+    return access_token, refresh_token
+
+
+async def rotate_session(db, refresh_token: str) -> tuple[str, str]:
+    """
+    Exchange a refresh token for a new token pair with one atomic
+    find_one_and_update. Presenting an already rotated refresh token is
+    treated as theft: the session is revoked, along with the access tokens
+    issued under it. The user's other sessions are left alone.
+    """
+    payload = decode_token(refresh_token, token_type="refresh_token")
+    session_id = payload.get("sid")
+    rotation = payload.get("rot")
+    if not session_id or rotation is None or not ObjectId.is_valid(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+
+    # Read the user itself, not the cached principal, so a deactivation or
+    # revocation from another worker can never be refreshed past
+    user = await db.users.find_one({"_id": ObjectId(payload["sub"])}, PRINCIPAL_PROJECTION)
+    if not user or not user.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
+    if payload.get("ver", 0) != user.get("token_version", 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
+
+    access_token, new_refresh_token = issue_session_tokens(
+        payload["sub"],
+        user["email"],
+        user.get("token_version", 0),
+        session_id,
+        rotation=rotation + 1
+    )
+    now = datetime.utcnow()
+    session = await db.sessions.find_one_and_update(
+        {
+            "_id": ObjectId(session_id),
+            "rotation": rotation,
+            "refresh_hash": hash_refresh_token(refresh_token),
+            "revoked": False,
+            "expires": {"$gt": now},
+        },
+        {
+            "$set": {
+                "refresh_hash": hash_refresh_token(new_refresh_token),
+                "updated_at": now,
+                "expires": now + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+            },
+            "$inc": {"rotation": 1},
+        },
+        projection={"_id": 1}
+    )
+    if session is None:
+        # Keep the revoked session until every access token it issued has
+        # expired; access tokens carrying its sid are rejected until then.
+        reused = await db.sessions.update_one(
+            {"_id": ObjectId(session_id), "rotation": {"$gt": rotation}},
+            {"$set": {
+                "revoked": True,
+                "updated_at": now,
+                "expires": now + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            }}
+        )
+        if reused.matched_count:
+            await revocations.bump(db)
+            logger.warning("Refresh token reuse detected for session %s, session revoked", session_id)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    return access_token, new_refresh_token
+
 
 def get_user_from_token(token: str, token_type: str = "access_token") -> str:
     decoded_token = decode_token(token, token_type=token_type)
@@ -150,34 +356,79 @@ def get_user_from_token(token: str, token_type: str = "access_token") -> str:
     return user_id
 
 
-async def verify_superuser(db, current_user: dict):
+async def revoke_user_sessions(db, user_id: Union[str, ObjectId]) -> Optional[int]:
     """
-    Utility function to verify if the current user is a superuser.
+    Invalidate every access and refresh token issued to a user by bumping
+    their token version. Returns the new version, or None if no such user.
     """
-    user_id = current_user["_id"]
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
-    
+    user = await db.users.find_one_and_update(
+        {"_id": ObjectId(user_id)},
+        {"$inc": {"token_version": 1}},
+        projection={"token_version": 1},
+        return_document=ReturnDocument.AFTER
+    )
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="SuperUser not found"
-        )
+        return None
+    await revocations.bump(db)
+    return user["token_version"]
 
-    if not user.get("is_superuser", False):
+
+async def verify_can_manage_user(db, current_user: dict, user_id: Union[str, ObjectId]) -> None:
+    """
+    Only superusers may act on superusers or users holding admin roles.
+    Unknown users are let through so the caller can answer 404.
+    """
+    if current_user.get("is_superuser", False):
+        return
+    target = await load_principal(db, str(user_id))
+    if target and (target.get("is_superuser", False) or target.get("roles")):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Insufficient permissions"
         )
 
 
+def build_status_update(is_active: bool) -> list:
+    """
+    Pipeline update that sets ``is_active`` and only touches ``updated_at``
+    for users whose status actually changes, so modified counts are exact.
+    """
+    return [{"$set": {
+        "updated_at": {"$cond": [
+            {"$ne": ["$is_active", is_active]},
+            "$$NOW",
+            "$updated_at"
+        ]},
+        "is_active": is_active,
+    }}]
+
+
 async def verify_membership_exists(db, membership_id):
     """
-    Verify that a membership exists in the database.
+    Verify that a membership exists in the catalog.
     """
-    membership = await db.memberships.find_one({"_id": ObjectId(membership_id)})
+    membership = membership_catalog.get(membership_id)
     if not membership:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Membership plan not found"
         )
-    return membership
\ No newline at end of file
+    return membership
+
+
+def get_membership_details(user_membership: Optional[dict]) -> Optional[dict]:
+    """
+    Combine a user's embedded membership with its plan from the catalog.
+    """
+    if not user_membership:
+        return None
+    membership = membership_catalog.get(user_membership.get("membership_id"))
+    if not membership:
+        return None
+    return {
+        "membership_name": membership["name"],
+        "membership_description": membership["description"],
+        "price": membership["price"],
+        "start_date": user_membership.get("start_date"),
+        "end_date": user_membership.get("end_date"),
+    }
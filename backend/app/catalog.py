@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_ID = "membership_catalog"
+
+
+class MembershipCatalog:
+    """
+    Per-worker in-memory copy of the membership plans.
+
+    Writers bump a version counter stored in ``db.meta``; every worker polls
+    that single document and reloads the plans when the version moves.
+    """
+
+    def __init__(self):
+        self._plans: dict[str, dict] = {}
+        self.version: Optional[int] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.version is not None
+
+    def get(self, membership_id) -> Optional[dict]:
+        return self._plans.get(str(membership_id))
+
+    def all(self) -> list[dict]:
+        return list(self._plans.values())
+
+    async def _read_version(self, db: AsyncIOMotorDatabase) -> int:
+        doc = await db.meta.find_one({"_id": CATALOG_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    async def load(self, db: AsyncIOMotorDatabase, version: Optional[int] = None) -> None:
+        # Read the version before the plans, so a concurrent bump is picked
+        # up again on the next poll rather than missed.
+        if version is None:
+            version = await self._read_version(db)
+        memberships = await db.memberships.find().to_list(None)
+        self._plans = {str(membership["_id"]): membership for membership in memberships}
+        self.version = version
+        logger.info("Loaded %d membership plans (version %d)", len(self._plans), version)
+
+    async def refresh_if_stale(self, db: AsyncIOMotorDatabase) -> None:
+        version = await self._read_version(db)
+        if version != self.version:
+            await self.load(db, version)
+
+    async def bump(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Record a catalog change for all workers and reload this one.
+        """
+        doc = await db.meta.find_one_and_update(
+            {"_id": CATALOG_VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self.load(db, doc["version"])
+
+    async def watch(self, db: AsyncIOMotorDatabase, interval: int) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_if_stale(db)
+            except Exception:
+                logger.exception("Membership catalog refresh failed")
+
+
+membership_catalog = MembershipCatalog()
@@ -0,0 +1,104 @@
+from datetime import datetime
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, status
+
+from app.checkins.writer import checkin_writer
+from app.dependencies import DatabaseDepends, CurrentUser, CheckinStaff, load_principal
+from app.models.models import (
+    CheckinRequest,
+    TurnstileCheckinRequest,
+    CheckinResponse,
+    CheckinSourceEnum
+)
+
+router = APIRouter()
+
+
+def record_checkin(principal: dict, gate: str | None, source: CheckinSourceEnum) -> CheckinResponse:
+    """
+    Validate the principal's membership and queue its check-in event.
+    """
+    if not principal.get("is_active", True):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is not active"
+        )
+    membership = principal.get("membership") or {}
+    end_date = membership.get("end_date")
+    checked_in_at = datetime.utcnow()
+    if not end_date or end_date <= checked_in_at:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No active membership"
+        )
+
+    accepted = checkin_writer.submit({
+        "checked_in_at": checked_in_at,
+        "meta": {"user_id": principal["_id"], "gate": gate, "source": source.value},
+        "membership_id": membership.get("membership_id"),
+    })
+    if not accepted:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Check-in service is busy, please retry.",
+            headers={"Retry-After": "1"}
+        )
+
+    return CheckinResponse(
+        user_id=str(principal["_id"]),
+        membership_id=str(membership.get("membership_id")),
+        membership_end_date=end_date,
+        checked_in_at=checked_in_at
+    )
+
+
+@router.post("/me", response_model=CheckinResponse)
+async def self_checkin(
+    checkin_data: CheckinRequest,
+    current_user: CurrentUser
+) -> CheckinResponse:
+    """
+    Check the current member in, e.g. from the app at the front desk.
+    """
+    try:
+        return record_checkin(current_user, checkin_data.gate, CheckinSourceEnum.SELF)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while checking in: {str(e)}"
+        )
+
+
+@router.post("/turnstile", response_model=CheckinResponse)
+async def turnstile_checkin(
+    checkin_data: TurnstileCheckinRequest,
+    db: DatabaseDepends,
+    current_user: CheckinStaff
+) -> CheckinResponse:
+    """
+    Check a member in from a turnstile or staff device. The member is read
+    from the principal cache, so repeat swipes cost no query.
+    """
+    try:
+        if not ObjectId.is_valid(checkin_data.user_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID format"
+            )
+        principal = await load_principal(db, checkin_data.user_id)
+        if not principal:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return record_checkin(principal, checkin_data.gate, CheckinSourceEnum.TURNSTILE)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred while checking in: {str(e)}"
+        )
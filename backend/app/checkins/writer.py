@@ -0,0 +1,120 @@
+import asyncio
+import logging
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class CheckinWriter:
+    """
+    Background writer for check-in events.
+
+    Events are put on a bounded queue and written to the ``checkins``
+    time-series collection with one unordered ``insert_many`` per batch. A
+    batch is flushed once ``batch_size`` events are waiting or
+    ``flush_interval`` seconds after its first event, whichever comes first.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, queue_size: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+
+    async def start(self, db: AsyncIOMotorDatabase) -> None:
+        if self.started:
+            return
+        self._db = db
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._task = asyncio.create_task(self._run(), name="checkin-writer")
+
+    async def stop(self) -> None:
+        """
+        Flush every queued event, then stop the writer.
+        """
+        if not self.started:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+        self._queue = None
+
+    def submit(self, event: dict) -> bool:
+        """
+        Queue one event for writing. Returns False if the queue is full.
+        """
+        if not self.started:
+            raise RuntimeError("Check-in writer is not started")
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "failed": self.failed,
+            "flushes": self.flushes,
+        }
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            event = await self._queue.get()
+            if event is _STOP:
+                break
+            batch = [event]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    event = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if event is _STOP:
+                    stopping = True
+                    break
+                batch.append(event)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[dict]) -> None:
+        self.flushes += 1
+        try:
+            result = await self._db.checkins.insert_many(batch, ordered=False)
+            self.written += len(result.inserted_ids)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            self.written += inserted
+            self.failed += len(batch) - inserted
+            logger.error("Check-in batch partially failed: %d of %d not written", len(batch) - inserted, len(batch))
+        except Exception:
+            self.failed += len(batch)
+            logger.exception("Failed to write %d check-ins", len(batch))
+
+
+checkin_writer = CheckinWriter(
+    batch_size=settings.CHECKIN_BATCH_SIZE,
+    flush_interval=settings.CHECKIN_FLUSH_INTERVAL_SECONDS,
+    queue_size=settings.CHECKIN_QUEUE_SIZE
+)
@@ -1,5 +1,6 @@
 import os
 import secrets
+import warnings
 from typing import Annotated, Any
 
 from dotenv import load_dotenv
@@ -7,6 +8,7 @@ from pydantic import (
     AnyUrl,
     BeforeValidator,
     computed_field,
+    model_validator,
 )
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing_extensions import Self
@@ -26,6 +28,42 @@ class Settings(BaseSettings):
 
     CLIENT_ORIGIN: str
 
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_CONNECT_TIMEOUT_MS: int = 10_000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5_000
+    MONGO_APP_NAME: str = "uhfc-fitness-api"
+    MONGO_BOOTSTRAP_ON_STARTUP: bool = False
+    MONGO_SLOW_QUERY_MS: float = 100.0
+    MONGO_EXPLAIN_MODE: str = "off"
+    MONGO_EXPLAIN_VERBOSITY: str = "queryPlanner"
+    MONGO_EXPLAIN_INTERVAL_SECONDS: float = 300.0
+    MONGO_EXPLAIN_MAX_CONCURRENT: int = 2
+    MONGO_DEBUG_HEADER: bool = False
+
+    EXPORT_BATCH_SIZE: int = 1000
+    TRUSTED_OUTPUT: bool = True
+
+    CATALOG_REFRESH_INTERVAL_SECONDS: int = 5
+
+    METRICS_ENABLED: bool = True
+    # Bearer token required to read /metrics; without one, only loopback
+    # clients may read it
+    METRICS_TOKEN: str | None = None
+    # Shared directory where each worker publishes its metrics, so that
+    # /metrics reports every worker; set by gunicorn.conf.py
+    METRICS_DIR: str | None = None
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 5.0
+
+    AUTH_COMPACTION_INTERVAL_SECONDS: int = 60 * 60
+
+    OTP_EXPIRE_MINUTES: int = 10
+    OTP_MAX_ATTEMPTS: int = 5
+
+    CHECKIN_BATCH_SIZE: int = 500
+    CHECKIN_FLUSH_INTERVAL_SECONDS: float = 1.0
+    CHECKIN_QUEUE_SIZE: int = 10_000
+
     model_config = SettingsConfigDict(
         env_file=".env",
         env_ignore_empty=True,
@@ -33,9 +71,18 @@ class Settings(BaseSettings):
         case_sensitive=True
     )
 
-    SECRET_KEY: str = secrets.token_urlsafe(32)
-    ACCESS_TOKEN_KEY: str = secrets.token_urlsafe(32)
-    REFRESH_TOKEN_KEY: str = secrets.token_urlsafe(32)
+    WEB_CONCURRENCY: int = 1
+
+    # Left unset, each process generates its own keys, which only works for
+    # a single worker. The *_KEY_ID is sent as the JWT ``kid`` header; keys
+    # listed in *_PREVIOUS_KEYS (kid -> key) are still accepted on decode.
+    SECRET_KEY: str | None = None
+    ACCESS_TOKEN_KEY: str | None = None
+    ACCESS_TOKEN_KEY_ID: str = "1"
+    ACCESS_TOKEN_PREVIOUS_KEYS: dict[str, str] = {}
+    REFRESH_TOKEN_KEY: str | None = None
+    REFRESH_TOKEN_KEY_ID: str = "1"
+    REFRESH_TOKEN_PREVIOUS_KEYS: dict[str, str] = {}
 
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 60
     REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 60
@@ -54,10 +101,55 @@ class Settings(BaseSettings):
     SMTP_USER: str | None = os.getenv("SMTP_USER")
     SMTP_PASSWORD: str | None = os.getenv("SMTP_PASSWORD")
 
+    SMTP_POOL_SIZE: int = 2
+    SMTP_QUEUE_SIZE: int = 1000
+    SMTP_TIMEOUT: int = 30
+
     EMAILS_FROM_EMAIL: str | None = os.getenv("EMAILS_FROM_EMAIL")
     EMAILS_FROM_NAME: str | None = os.getenv("EMAILS_FROM_EMAIL")
 
     EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 1
+    EMAIL_TEMPLATES_AUTO_RELOAD: bool = os.getenv("ENVIRONMENT") == "development"
+
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = os.cpu_count() or 1
+    PASSWORD_HASH_MAX_CONCURRENCY: int = os.cpu_count() or 1
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_URL: str | None = None
+    RATE_LIMIT_LOGIN_PER_IP: str = "20/60"
+    RATE_LIMIT_LOGIN_PER_EMAIL: str = "5/60"
+    RATE_LIMIT_VERIFY_OTP_PER_IP: str = "20/60"
+    RATE_LIMIT_VERIFY_OTP_PER_EMAIL: str = "5/600"
+    RATE_LIMIT_PASSWORD_RESET_PER_IP: str = "5/60"
+    RATE_LIMIT_PASSWORD_RESET_PER_EMAIL: str = "3/3600"
+    RATE_LIMIT_SET_PASSWORD_PER_IP: str = "10/60"
+    RATE_LIMIT_SET_PASSWORD_PER_EMAIL: str = "5/600"
+
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    REVOCATION_POLL_INTERVAL_SECONDS: float = 1.0
+
+    TOKEN_CACHE_SIZE: int = 10_000
+    TOKEN_CACHE_TTL_SECONDS: int = 60 * 60
+
+    LOG_LEVEL: str = "INFO"
+
+    @model_validator(mode="after")
+    def _check_signing_keys(self) -> Self:
+        missing = [
+            name for name in ("SECRET_KEY", "ACCESS_TOKEN_KEY", "REFRESH_TOKEN_KEY")
+            if not getattr(self, name)
+        ]
+        if missing and self.WEB_CONCURRENCY > 1:
+            raise ValueError(
+                f"{', '.join(missing)} must be set when running "
+                f"{self.WEB_CONCURRENCY} workers; generated keys differ per process"
+            )
+        for name in missing:
+            warnings.warn(f"{name} is not set, using an ephemeral key", stacklevel=2)
+            setattr(self, name, secrets.token_urlsafe(32))
+        return self
 
     @computed_field
     @property
@@ -1,33 +1,180 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
 import pymongo
-from pymongo import mongo_client
+from pymongo.errors import CollectionInvalid, OperationFailure
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from app.config import settings
+from app.monitoring import query_counter
+
+OTP_INDEX_MIGRATION_ID = "otp_indexes_v2"
+
+logger = logging.getLogger(__name__)
+
+client: Optional[AsyncIOMotorClient] = None
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    if client is None:
+        raise RuntimeError("MongoDB client is not connected")
+    return client[settings.MONGO_DATABASE]
+
+
+async def connect_to_mongo() -> AsyncIOMotorDatabase:
+    """
+    Open the process-wide Motor client and make sure the server is reachable.
+    """
+    global client
+    if client is None:
+        client = AsyncIOMotorClient(
+            settings.DATABASE_URL,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            appname=settings.MONGO_APP_NAME,
+            event_listeners=[query_counter],
+        )
+    try:
+        await client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        logger.exception("Could not connect to MongoDB")
+        close_mongo_connection()
+        raise
+    logger.info("Successfully connected to MongoDB")
+    return get_database()
+
+
+def close_mongo_connection() -> None:
+    global client
+    if client is not None:
+        client.close()
+        client = None
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """
+    Create the indexes the application relies on. Safe to run repeatedly;
+    run it once per deploy with ``python -m app.db``.
+    """
+    await db.users.create_index([("email", pymongo.ASCENDING)], unique=True)
+    await db.users.create_index([("created_at", pymongo.ASCENDING)], unique=False)
+    await db.users.create_index([("created_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    await db.users.create_index([("updated_at", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    await db.users.create_index([("is_active", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    await db.users.create_index([("is_verified", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    # get_user_list filters on membership status and pages on _id
+    await db.users.create_index([("membership.end_date", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    await db.users.create_index([("membership", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])
+    await db.users.create_index([("search.email", pymongo.ASCENDING)])
+    # Also serves first-name-only searches, as its prefix
+    await db.users.create_index([("search.first_name", pymongo.ASCENDING), ("search.last_name", pymongo.ASCENDING)])
+    await db.users.create_index([("search.last_name", pymongo.ASCENDING)])
+    await db.sessions.create_index([("user_id", pymongo.ASCENDING)])
+    await db.sessions.create_index(
+        [("revoked", pymongo.ASCENDING)],
+        partialFilterExpression={"revoked": True}
+    )
+    await db.sessions.create_index([("expires", pymongo.ASCENDING)], expireAfterSeconds=0)
+    await migrate_otp_indexes(db)
+    await db.otps.create_index([("expires_at", pymongo.ASCENDING)], expireAfterSeconds=0)
+    await ensure_checkins_collection(db)
+    await db.checkins.create_index([("meta.user_id", pymongo.ASCENDING), ("checked_in_at", pymongo.DESCENDING)])
+    logger.info("MongoDB indexes are up to date")
+
+
+async def migrate_otp_indexes(db: AsyncIOMotorDatabase) -> None:
+    """
+    Replace the legacy globally unique ``otp`` index, on which six-digit
+    codes collided across users, with one code per user and type. Called
+    on startup, since OTP documents no longer have an ``otp`` field and a
+    leftover index would reject every code after the first; a marker in
+    ``db.meta`` makes every start after the first a single lookup.
+    """
+    if await db.meta.find_one({"_id": OTP_INDEX_MIGRATION_ID}):
+        return
+    if "otp_1" in await db.otps.index_information():
+        try:
+            await db.otps.drop_index("otp_1")
+        except OperationFailure:
+            # Another worker dropped it first
+            pass
+    # Plaintext codes from before the migration can never be verified
+    await db.otps.delete_many({"otp_hash": {"$exists": False}})
+    await db.otps.create_index(
+        [("user_id", pymongo.ASCENDING), ("type", pymongo.ASCENDING)],
+        unique=True
+    )
+    await db.meta.update_one(
+        {"_id": OTP_INDEX_MIGRATION_ID},
+        {"$set": {"applied_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def ensure_checkins_collection(db: AsyncIOMotorDatabase) -> None:
+    """
+    Create ``checkins`` as a time-series collection. Raises if it already
+    exists as a regular collection, e.g. one created implicitly by an
+    insert, since time-series options cannot be added afterwards.
+
+    Events are bucketed by ``meta``, which holds the member along with the
+    gate and source, so one member's check-ins are stored together.
+    """
+    try:
+        await db.create_collection(
+            "checkins",
+            timeseries={
+                "timeField": "checked_in_at",
+                "metaField": "meta",
+                "granularity": "seconds",
+            }
+        )
+    except CollectionInvalid:
+        pass
+    except OperationFailure as e:
+        # NamespaceExists, raised by the server when another worker created
+        # the collection first
+        if e.code != 48:
+            raise
+    cursor = await db.list_collections(filter={"name": "checkins"})
+    collections = await cursor.to_list(length=1)
+    if not collections or collections[0].get("type") != "timeseries":
+        raise RuntimeError(
+            "The checkins collection exists but is not a time-series collection; "
+            "migrate its documents into a time-series collection before starting"
+        )
+
+
+async def backfill_search_fields(db: AsyncIOMotorDatabase) -> int:
+    """
+    Populate the normalized ``search`` fields for users created before they
+    existed. Runs server-side as a single pipeline update.
+    """
+    result = await db.users.update_many(
+        {"search": {"$exists": False}},
+        [{"$set": {"search": {
+            "email": {"$toLower": "$email"},
+            "first_name": {"$toLower": {"$trim": {"input": {"$ifNull": ["$profile.first_name", ""]}}}},
+            "last_name": {"$toLower": {"$trim": {"input": {"$ifNull": ["$profile.last_name", ""]}}}},
+        }}}]
+    )
+    logger.info("Backfilled search fields for %d users", result.modified_count)
+    return result.modified_count
+
+
+async def bootstrap() -> None:
+    db = await connect_to_mongo()
+    try:
+        await ensure_indexes(db)
+        await backfill_search_fields(db)
+    finally:
+        close_mongo_connection()
+
 
-try:
-
-    client = mongo_client.MongoClient(settings.DATABASE_URL)
-    client.admin.command('ping')
-    print("Successfully connected to MongoDB")
-
-    db = client[settings.MONGO_DATABASE]
-    Users = db.users
-    Tokens = db.tokens
-    Otps = db.otps
-
-    # Creating indexes for more smooth retrival
-    Users.create_index([("email", pymongo.ASCENDING)], unique=True)
-    Users.create_index([("created_at", pymongo.ASCENDING)], unique=False)
-    Tokens.create_index([("token", pymongo.ASCENDING)], unique=True)
-    Tokens.create_index([("user_id", pymongo.ASCENDING)])
-    Tokens.create_index([
-        ("token", pymongo.ASCENDING),
-        ("token_type", pymongo.ASCENDING)
-    ])
-    Otps.create_index([("otp", pymongo.ASCENDING)], unique=True)
-
-except pymongo.errors.ConfigurationError as config_error:
-    print(f"MongoDB Configuration Error: {config_error}")
-except pymongo.errors.ConnectionFailure as conn_error:
-    print(f"MongoDB Connection Error: {conn_error}")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(bootstrap())
@@ -1,5 +1,7 @@
+import hashlib
+import time
 from datetime import datetime
-from typing import Annotated, Optional
+from typing import Annotated, Callable, Optional
 
 from bson import ObjectId
 from fastapi import Depends, HTTPException, Request, status
@@ -7,67 +9,129 @@ from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError
 from motor.motor_asyncio import AsyncIOMotorClient
 
+from app.cache import TTLCache
 from app.config import settings
-from app.models.models import TokenPayload
+from app.db import get_database
+from app.models.models import AdminRoleEnum, TokenPayload
+from app.revocation import RevocationFeed
 from app.utils import decode_token
 
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
-client = AsyncIOMotorClient(settings.DATABASE_URL)
-db = client[settings.MONGO_DATABASE]
-
 async def get_db():
-    try:
-        yield db
-    finally:
-
-        pass
+    yield get_database()
 
 def get_client_ip(request: Request) -> str:
     return request.client.host
 
 DatabaseDepends = Annotated[AsyncIOMotorClient, Depends(get_db)]
 TokenDepends = Annotated[str, Depends(reusable_oauth2)]
-
-async def verify_token_blacklist(db: DatabaseDepends, token: str) -> bool:
-    blacklisted = await db.tokens.find_one({
-        "token": token,
-        "is_valid": True
-    })
-    return bool(blacklisted)
+ClientIpDepends = Annotated[str, Depends(get_client_ip)]
+
+PRINCIPAL_PROJECTION = {
+    "email": 1,
+    "is_active": 1,
+    "is_verified": 1,
+    "is_superuser": 1,
+    "roles": 1,
+    "membership": 1,
+    "token_version": 1,
+}
+
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
+# Cleared on every worker when a revocation is broadcast
+revocations = RevocationFeed(on_change=principal_cache.clear)
+
+token_cache = TTLCache(
+    maxsize=settings.TOKEN_CACHE_SIZE,
+    ttl=settings.TOKEN_CACHE_TTL_SECONDS
+)
+
+def verify_access_token(token: str) -> TokenPayload:
+    """
+    Verify an access token and parse its claims. A token that was already
+    verified is served from the cache until it expires; revocation is still
+    enforced per request through the principal's token version.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is None:
+        token_data = TokenPayload(**decode_token(token))
+        token_cache.set(key, token_data, ttl=token_data.exp - time.time())
+    return token_data
+
+def invalidate_principal(user_id) -> None:
+    """
+    Drop the cached principal of the given user on this worker only. Use
+    ``revocations.bump`` for changes that every worker must see.
+    """
+    principal_cache.pop(str(user_id))
+
+def invalidate_principals(user_ids) -> int:
+    return sum(principal_cache.pop(str(user_id)) for user_id in user_ids)
+
+def invalidate_principals_where(predicate: Callable[[dict], bool]) -> int:
+    """
+    Drop, in one pass over the cache, every principal matching ``predicate``.
+    """
+    return principal_cache.invalidate_where(lambda key, principal: predicate(principal))
+
+async def load_principal(db, user_id: str) -> Optional[dict]:
+    """
+    Return the slim principal document of a user, from the cache when possible.
+    """
+    principal = principal_cache.get(user_id)
+    if principal is None:
+        principal = await db.users.find_one(
+            {"_id": ObjectId(user_id)},
+            PRINCIPAL_PROJECTION
+        )
+        if principal is None:
+            return None
+        principal_cache.set(user_id, principal)
+    return principal
 
 async def get_current_user(
     db: DatabaseDepends,
     token: TokenDepends,
 ):
     try:
-        payload = decode_token(token)
-        token_data = TokenPayload(**payload)
-
-        is_valid = await verify_token_blacklist(db, token)
-        if is_valid:
+        token_data = verify_access_token(token)
+        if revocations.is_session_revoked(token_data.sid):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Token has been revoked"
+                detail="Session has been revoked"
             )
 
-        user = await db.users.find_one({"_id": ObjectId(token_data.sub)})
-        if not user:
+        principal = await load_principal(db, token_data.sub)
+        if not principal:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-        if not user.get("is_active", True):
+        if token_data.ver != principal.get("token_version", 0):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+        if not principal.get("is_active", True):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Inactive user"
             )
 
+        user = dict(principal)
         user["token"] = token
         user["token_data"] = token_data
 
         return user
 
+    except HTTPException:
+        raise
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -85,3 +149,31 @@ async def get_current_user(
         )
 
 CurrentUser = Annotated[dict, Depends(get_current_user)]
+
+def require_roles(*roles: AdminRoleEnum) -> Callable:
+    """
+    Dependency admitting superusers and users holding any of ``roles``.
+    Authorizes from the principal already loaded by get_current_user.
+    """
+    allowed = {role.value for role in roles}
+
+    async def authorize(current_user: CurrentUser) -> dict:
+        if current_user.get("is_superuser", False):
+            return current_user
+        if allowed.isdisjoint(current_user.get("roles") or ()):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Insufficient permissions"
+            )
+        return current_user
+
+    return authorize
+
+SuperUser = Annotated[dict, Depends(require_roles())]
+UserViewer = Annotated[dict, Depends(require_roles(
+    AdminRoleEnum.USER_VIEWER, AdminRoleEnum.USER_MANAGER
+))]
+UserManager = Annotated[dict, Depends(require_roles(AdminRoleEnum.USER_MANAGER))]
+MembershipManager = Annotated[dict, Depends(require_roles(AdminRoleEnum.MEMBERSHIP_MANAGER))]
+CheckinStaff = Annotated[dict, Depends(require_roles(AdminRoleEnum.CHECKIN_STAFF))]
+AnyAdmin = Annotated[dict, Depends(require_roles(*AdminRoleEnum))]
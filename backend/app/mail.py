@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from email.message import Message
+from typing import Optional
+
+import aiosmtplib
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the connection is gone but the message may be fine
+RECONNECT_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, OSError)
+
+
+class MailTransport:
+    """
+    Background SMTP sender.
+
+    Messages are put on a bounded queue and delivered by ``pool_size``
+    workers, each holding its own authenticated SMTP connection that is
+    reused across messages and re-opened after a failure.
+    """
+
+    def __init__(
+        self,
+        hostname: Optional[str],
+        port: int,
+        username: Optional[str],
+        password: Optional[str],
+        use_tls: bool,
+        start_tls: bool,
+        pool_size: int,
+        queue_size: int,
+        timeout: float
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.start_tls = start_tls
+        self.pool_size = pool_size
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.started:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"smtp-worker-{i}")
+            for i in range(self.pool_size)
+        ]
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """
+        Wait for queued messages to go out, then close all connections.
+        """
+        if not self.started:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Mail queue not drained, %d messages dropped", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    def enqueue(self, message: Message) -> None:
+        if not self.started:
+            raise RuntimeError("Mail transport is not started")
+        try:
+            self._queue.put_nowait((message, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.error("Mail queue full, dropping message to %s", message["To"])
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "latency_avg_seconds": self.latency_total / self.sent if self.sent else 0.0,
+            "latency_max_seconds": self.latency_max,
+        }
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            use_tls=self.use_tls,
+            start_tls=self.start_tls,
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        if self.username and self.password:
+            await smtp.login(self.username, self.password)
+        return smtp
+
+    async def _deliver(self, smtp: Optional[aiosmtplib.SMTP], message: Message) -> aiosmtplib.SMTP:
+        """
+        Send ``message`` and return the connection to keep using. A connection
+        the server dropped while idle is re-opened and the send retried once.
+        """
+        try:
+            if smtp is None or not smtp.is_connected:
+                smtp = await self._connect()
+            await smtp.send_message(message)
+            return smtp
+        except RECONNECT_ERRORS as e:
+            logger.info("SMTP connection lost (%s), reconnecting", e)
+            if smtp is not None:
+                smtp.close()
+        smtp = await self._connect()
+        try:
+            await smtp.send_message(message)
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    async def _worker(self) -> None:
+        smtp: Optional[aiosmtplib.SMTP] = None
+        try:
+            while True:
+                message, enqueued_at = await self._queue.get()
+                try:
+                    smtp = await self._deliver(smtp, message)
+                    latency = time.perf_counter() - enqueued_at
+                    self.sent += 1
+                    self.latency_total += latency
+                    self.latency_max = max(self.latency_max, latency)
+                except Exception as e:
+                    self.failed += 1
+                    logger.error("Failed to send email to %s: %s", message["To"], e)
+                    if smtp is not None:
+                        smtp.close()
+                    smtp = None
+                finally:
+                    self._queue.task_done()
+        finally:
+            if smtp is not None and smtp.is_connected:
+                try:
+                    await smtp.quit()
+                except Exception:
+                    smtp.close()
+
+
+_smtp_port = settings.SMTP_PORT or 465
+_smtp_implicit_tls = settings.SMTP_SSL or _smtp_port == 465
+
+mail_transport = MailTransport(
+    hostname=settings.SMTP_HOST,
+    port=_smtp_port,
+    username=settings.SMTP_USER or settings.EMAILS_FROM_EMAIL,
+    password=settings.SMTP_PASSWORD,
+    use_tls=_smtp_implicit_tls,
+    start_tls=settings.SMTP_TLS and not _smtp_implicit_tls,
+    pool_size=settings.SMTP_POOL_SIZE,
+    queue_size=settings.SMTP_QUEUE_SIZE,
+    timeout=settings.SMTP_TIMEOUT
+)
@@ -1,36 +1,162 @@
-from fastapi import FastAPI, Request
+import asyncio
+import secrets
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.catalog import membership_catalog
 from app.config import settings
 from app.auth import auth_router, admin_router
+from app.checkins import checkin_router
+from app.checkins.writer import checkin_writer
+from app.db import (
+    close_mongo_connection,
+    connect_to_mongo,
+    ensure_checkins_collection,
+    ensure_indexes,
+    migrate_otp_indexes
+)
+from app.dependencies import principal_cache, revocations, token_cache
+from app.log import setup_logging, shutdown_logging
+from app.mail import mail_transport
+from app.metrics import MetricsMiddleware, metrics_registry
+from app.monitoring import QueryTrackingMiddleware, query_counter
+from app.ratelimit import rate_limiter
+from app.responses import ORJSONResponse
+from app.maintenance import run_periodic_compaction
+from app.utils import password_hasher, precompile_email_templates
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    db = await connect_to_mongo()
+    if settings.MONGO_BOOTSTRAP_ON_STARTUP:
+        await ensure_indexes(db)
+    else:
+        await migrate_otp_indexes(db)
+        # The writer's inserts would otherwise create a regular collection
+        await ensure_checkins_collection(db)
+    await membership_catalog.load(db)
+    await revocations.load(db)
+    precompile_email_templates()
+    if settings.emails_enabled:
+        await mail_transport.start()
+    await checkin_writer.start(db)
+    background_tasks = [
+        asyncio.create_task(
+            membership_catalog.watch(db, settings.CATALOG_REFRESH_INTERVAL_SECONDS)
+        ),
+        asyncio.create_task(
+            revocations.watch(db, settings.REVOCATION_POLL_INTERVAL_SECONDS)
+        ),
+    ]
+    if settings.AUTH_COMPACTION_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            run_periodic_compaction(db, settings.AUTH_COMPACTION_INTERVAL_SECONDS)
+        ))
+    if settings.METRICS_ENABLED and metrics_registry.directory:
+        background_tasks.append(asyncio.create_task(
+            metrics_registry.publish_periodically(collect_gauges, settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+        ))
+    yield
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await mail_transport.stop()
+    await checkin_writer.stop()
+    password_hasher.shutdown()
+    await rate_limiter.backend.close()
+    close_mongo_connection()
+    shutdown_logging()
+
 
 app = FastAPI(
     title="UHFC Fitness",
     description=f"ap1/v1/openapi.json",
     version="3.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 origins = [
     origin.strip() for origin in settings.CLIENT_ORIGIN.split(",")
 ]
 
+app.add_middleware(QueryTrackingMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Mongo-Queries"],
 )
 
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 app.include_router(auth_router.router, tags=[
                    'Authentication'], prefix=f"/api/v1/auth")
 app.include_router(admin_router.router, tags=[
                    'Admin'], prefix=f"/api/v1/admin")
+app.include_router(checkin_router.router, tags=[
+                   'Check-ins'], prefix="/api/v1/checkins")
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "I'm Enjoy Great Health WBU?"}
 
+
+def collect_gauges() -> list[tuple[str, str, float]]:
+    hasher_stats = password_hasher.stats()
+    mail_stats = mail_transport.stats()
+    checkin_stats = checkin_writer.stats()
+    return [
+        ("password_hash_in_flight", "Password hash jobs running.", hasher_stats["in_flight"]),
+        ("password_hash_queued", "Password hash jobs waiting for a worker.", hasher_stats["queued"]),
+        ("password_hash_max_queued", "Peak password hash queue depth.", hasher_stats["max_queued"]),
+        ("mail_queued", "Emails waiting to be sent.", mail_stats["queued"]),
+        ("mail_sent", "Emails sent.", mail_stats["sent"]),
+        ("mail_failed", "Emails that failed to send.", mail_stats["failed"]),
+        ("mail_dropped", "Emails dropped because the queue was full.", mail_stats["dropped"]),
+        ("mail_latency_avg_seconds", "Average time from enqueue to delivery.", mail_stats["latency_avg_seconds"]),
+        ("principal_cache_size", "Cached principals.", len(principal_cache)),
+        ("principal_cache_hits", "Principal cache hits.", principal_cache.hits),
+        ("principal_cache_misses", "Principal cache misses.", principal_cache.misses),
+        ("token_cache_size", "Cached verified access tokens.", len(token_cache)),
+        ("token_cache_hits", "Verified token cache hits.", token_cache.hits),
+        ("token_cache_misses", "Verified token cache misses.", token_cache.misses),
+        ("rate_limit_rejected", "Requests rejected with 429.", rate_limiter.rejected),
+        ("mongo_slow_commands", "Mongo commands slower than MONGO_SLOW_QUERY_MS.", query_counter.slow_commands),
+        ("mongo_collscans", "Explained Mongo commands that scanned a whole collection.", query_counter.collscans),
+        ("checkins_queued", "Check-ins waiting to be written.", checkin_stats["queued"]),
+        ("checkins_written", "Check-ins written.", checkin_stats["written"]),
+        ("checkins_failed", "Check-ins that failed to write.", checkin_stats["failed"]),
+        ("checkin_flushes", "Check-in batch inserts.", checkin_stats["flushes"]),
+    ]
+
+
+def metrics_access_allowed(request: Request) -> bool:
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        return secrets.compare_digest(request.headers.get("authorization", ""), expected)
+    return request.client is not None and request.client.host in ("127.0.0.1", "::1")
+
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False, response_class=PlainTextResponse)
+    async def metrics(request: Request):
+        if not metrics_access_allowed(request):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not allowed to read metrics"
+            )
+        return metrics_registry.render(collect_gauges())
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.db import close_mongo_connection, connect_to_mongo
+
+logger = logging.getLogger(__name__)
+
+COMPACTION_LEASE_ID = "auth_compaction"
+
+
+async def compact_auth_collections(db: AsyncIOMotorDatabase) -> dict:
+    """
+    Remove auth records that can never be used again. Expired rows are
+    handled by the TTL indexes; this sweeps the OTPs that were consumed
+    before they expired. Revoked sessions are left to their TTL, since they
+    must outlive the access tokens issued under them.
+    """
+    otps = await db.otps.delete_many({"is_verified": True})
+
+    report = {
+        "otps_removed": otps.deleted_count,
+        "finished_at": datetime.utcnow(),
+    }
+    logger.info(
+        "Auth compaction removed %d otps",
+        report["otps_removed"]
+    )
+    return report
+
+
+async def acquire_compaction_lease(db: AsyncIOMotorDatabase, interval: int) -> bool:
+    """
+    Claim the next compaction run. The lease lives in ``db.meta`` and is due
+    once per interval, so only one worker across all processes and hosts
+    wins it; the others find it taken and skip the sweep.
+    """
+    now = datetime.utcnow()
+    try:
+        await db.meta.update_one(
+            {"_id": COMPACTION_LEASE_ID, "next_run_at": {"$lte": now}},
+            # Slightly under one interval, so timer drift between the workers
+            # never makes all of them find the lease not yet due
+            {"$set": {"next_run_at": now + timedelta(seconds=interval * 0.9)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # The lease exists and is not due yet
+        return False
+    return True
+
+
+async def run_periodic_compaction(db: AsyncIOMotorDatabase, interval: int) -> None:
+    """
+    Run on every worker; each interval, the one holding the lease compacts
+    and records its report on the lease document.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            if not await acquire_compaction_lease(db, interval):
+                continue
+            report = await compact_auth_collections(db)
+            await db.meta.update_one(
+                {"_id": COMPACTION_LEASE_ID},
+                {"$set": {"last_report": report}}
+            )
+        except Exception:
+            logger.exception("Auth compaction failed")
+
+
+async def main() -> None:
+    db = await connect_to_mongo()
+    try:
+        await compact_auth_collections(db)
+    finally:
+        close_mongo_connection()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,248 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from bisect import bisect_left
+from contextlib import suppress
+from typing import Callable, Iterable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RouteMetrics:
+    """Counters for one (method, route) pair, allocated once and updated in place."""
+
+    __slots__ = (
+        "bucket_counts",
+        "count",
+        "latency_sum",
+        "status_counts",
+        "request_bytes",
+        "response_bytes",
+    )
+
+    def __init__(self):
+        # One slot per bucket plus the +Inf bucket
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.status_counts: dict[int, int] = {}
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def observe(self, status_code: int, duration: float, request_bytes: int, response_bytes: int) -> None:
+        self.bucket_counts[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.count += 1
+        self.latency_sum += duration
+        self.status_counts[status_code] = self.status_counts.get(status_code, 0) + 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+
+
+class MetricsRegistry:
+    """
+    Metrics of this worker process. Every series is labelled with the
+    worker's pid; with ``directory`` set, each worker publishes snapshots
+    there and any worker can render all of them, so a scrape covers every
+    process instead of whichever one accepted the connection.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+        self.directory = directory
+
+    def route(self, method: str, path: str) -> RouteMetrics:
+        key = (method, path)
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics()
+        return metrics
+
+    def snapshot(self, gauges: Iterable[tuple[str, str, float]] = ()) -> dict:
+        return {
+            "pid": os.getpid(),
+            "in_flight": self.in_flight,
+            "routes": [
+                [
+                    method,
+                    path,
+                    metrics.bucket_counts,
+                    metrics.count,
+                    metrics.latency_sum,
+                    list(metrics.status_counts.items()),
+                    metrics.request_bytes,
+                    metrics.response_bytes,
+                ]
+                for (method, path), metrics in self.routes.items()
+            ],
+            "gauges": [list(gauge) for gauge in gauges],
+        }
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def publish(self, gauges: Iterable[tuple[str, str, float]] = ()) -> None:
+        """Write this worker's snapshot, replacing the previous one atomically."""
+        path = self._snapshot_path(os.getpid())
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(self.snapshot(gauges), f)
+        os.replace(f"{path}.tmp", path)
+
+    def unpublish(self, pid: Optional[int] = None) -> None:
+        with suppress(FileNotFoundError):
+            os.remove(self._snapshot_path(pid or os.getpid()))
+
+    def _published(self) -> list[dict]:
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed or replaced while listing
+                continue
+        return snapshots
+
+    def render(self, gauges: Iterable[tuple[str, str, float]] = ()) -> str:
+        """
+        Render all metrics in the Prometheus text exposition format.
+        ``gauges`` are extra ``(name, help, value)`` triples to include.
+        """
+        if self.directory is None:
+            return render_snapshots([self.snapshot(gauges)])
+        self.publish(gauges)
+        return render_snapshots(self._published())
+
+    async def publish_periodically(self, gauges: Callable[[], Iterable[tuple[str, str, float]]], interval: float) -> None:
+        try:
+            while True:
+                try:
+                    self.publish(gauges())
+                except OSError:
+                    logger.exception("Could not publish metrics snapshot")
+                await asyncio.sleep(interval)
+        finally:
+            self.unpublish()
+
+
+def render_snapshots(snapshots: list[dict]) -> str:
+    """
+    Render worker snapshots in the Prometheus text exposition format, one
+    family at a time, each series labelled with the worker's pid.
+    """
+    snapshots = sorted(snapshots, key=lambda snapshot: snapshot["pid"])
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+    ]
+    for snapshot in snapshots:
+        lines.append(f'http_requests_in_flight{{pid="{snapshot["pid"]}"}} {snapshot["in_flight"]}')
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency by route.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for snapshot in snapshots:
+        pid = snapshot["pid"]
+        for method, path, bucket_counts, count, latency_sum, _, _, _ in snapshot["routes"]:
+            labels = f'pid="{pid}",method="{method}",route="{path}"'
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {latency_sum}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+    lines += [
+        "# HELP http_responses_total Responses by route and status code.",
+        "# TYPE http_responses_total counter",
+    ]
+    for snapshot in snapshots:
+        pid = snapshot["pid"]
+        for method, path, _, _, _, status_counts, _, _ in snapshot["routes"]:
+            for status_code, count in status_counts:
+                lines.append(
+                    f'http_responses_total{{pid="{pid}",method="{method}",route="{path}",status="{status_code}"}} {count}'
+                )
+
+    for name, index, help_text in (
+        ("http_request_size_bytes_total", 6, "Request body bytes received."),
+        ("http_response_size_bytes_total", 7, "Response body bytes sent."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for snapshot in snapshots:
+            pid = snapshot["pid"]
+            for route in snapshot["routes"]:
+                lines.append(f'{name}{{pid="{pid}",method="{route[0]}",route="{route[1]}"}} {route[index]}')
+
+    gauges: dict[str, tuple[str, list[str]]] = {}
+    for snapshot in snapshots:
+        pid = snapshot["pid"]
+        for name, help_text, value in snapshot["gauges"]:
+            gauges.setdefault(name, (help_text, []))[1].append(f'{name}{{pid="{pid}"}} {value}')
+    for name, (help_text, samples) in gauges.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", *samples]
+
+    return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry(settings.METRICS_DIR)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status codes, payload sizes
+    and in-flight requests. Routes are labelled by their path template so
+    path parameters do not create new series.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = self.registry
+        status_code = 500
+        request_bytes = 0
+        response_bytes = 0
+
+        async def receive_wrapper():
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        registry.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            registry.in_flight -= 1
+            route = scope.get("route")
+            path = getattr(route, "path", UNMATCHED_ROUTE)
+            registry.route(scope["method"], path).observe(
+                status_code, duration, request_bytes, response_bytes
+            )
@@ -1,9 +1,9 @@
 import re
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any, List, Optional
 from enum import Enum
 from bson import ObjectId
-from pydantic import BaseModel, EmailStr, Field, field_validator, validator, conlist
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator, validator, conlist
 from pydantic_core import CoreSchema, core_schema
 
 class PyObjectId(ObjectId):
@@ -56,12 +56,17 @@ class RegisterUser(BaseModel):
 class RegisterUserResponse(BaseModel):
     message: str = "Registration sucess! Otp sent to email"
 
+class OTPTypeEnum(str, Enum):
+    REGISTER = "Register"
+    FORGET_PASSWORD = "ForgetPassword"
+
 class OTP(BaseModel):
     user_id: PyObjectId
-    otp: str
-    type: str
+    otp_hash: str
+    type: OTPTypeEnum
     created_at: datetime
     expires_at: datetime
+    attempts: int = 0
     is_verified: bool = False
 
 class TokenPayload(BaseModel):
@@ -69,6 +74,8 @@ class TokenPayload(BaseModel):
     exp: int
     type: str
     email: str
+    ver: int = 0
+    sid: Optional[str] = None
 
 class VerifyOtpRequest(BaseModel):
     email: str
@@ -222,6 +229,9 @@ class RefreshTokenResponse(BaseModel):
     access_token: str
     refresh_token: str = None
 
+class LogoutAllResponse(BaseModel):
+    message: str = "Signed out of all sessions"
+
 
 class AdminUserList(BaseModel):
     id: str = Field(..., alias="_id") 
@@ -234,13 +244,72 @@ class AdminUserList(BaseModel):
     class Config:
         populate_by_name = True 
 
+class MembershipStatusEnum(str, Enum):
+    ACTIVE = "active"
+    EXPIRED = "expired"
+    NONE = "none"
+
+class MemberSearchResult(BaseModel):
+    id: str
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    is_active: bool
+
+class ExportFormatEnum(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class ExportWatermarkEnum(str, Enum):
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+
 class AdminUpdateUserStatus(BaseModel):
     is_active: bool
 
+class AdminBulkUpdateUserStatus(BaseModel):
+    is_active: bool
+    user_ids: Optional[List[str]] = Field(None, min_length=1, max_length=5000)
+    membership_ended_before: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def validate_selector(self):
+        if self.user_ids is None and self.membership_ended_before is None:
+            raise ValueError("Provide user_ids and/or membership_ended_before")
+        ended_before = self.membership_ended_before
+        if ended_before is not None and ended_before.tzinfo is not None:
+            # Stored dates are naive UTC
+            self.membership_ended_before = ended_before.astimezone(timezone.utc).replace(tzinfo=None)
+        return self
+
+class AdminBulkUpdateUserStatusResponse(BaseModel):
+    is_active: bool
+    matched_count: int
+    modified_count: int
+    invalidated_principals: int
+
 class AdminUpdateUserResponse(BaseModel):
     user_id: str
     is_active: bool
 
+class AdminRevokeSessionsResponse(BaseModel):
+    user_id: str
+    token_version: int
+
+class AdminRoleEnum(str, Enum):
+    USER_VIEWER = "user_viewer"
+    USER_MANAGER = "user_manager"
+    MEMBERSHIP_MANAGER = "membership_manager"
+    CHECKIN_STAFF = "checkin_staff"
+
+class AdminSetUserRoles(BaseModel):
+    roles: List[AdminRoleEnum]
+
+class AdminSetUserRolesResponse(BaseModel):
+    message: str = "User roles updated successfully"
+    user_id: str
+    roles: List[AdminRoleEnum]
+
 
 class MembershipPlanEnum(str, Enum):
     GOLD = "Gold"
@@ -278,7 +347,46 @@ class UserSubscriptionResponse(BaseModel):
     start_date: datetime
     end_date: datetime
 
+class BulkSubscriptionItem(BaseModel):
+    user_id: str
+    membership_id: str
+
+class BulkSubscriptionRequest(BaseModel):
+    items: List[BulkSubscriptionItem] = Field(..., min_length=1, max_length=1000)
+
+class BulkSubscriptionItemResult(BaseModel):
+    user_id: str
+    membership_id: str
+    status: str
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+
+class BulkSubscriptionResponse(BaseModel):
+    requested: int
+    subscribed: int
+    failed: int
+    results: List[BulkSubscriptionItemResult]
+
 class GetProfileResponse(BaseModel):
     message: str
     profile: dict
     membership: Optional[dict] = None
+
+
+class CheckinSourceEnum(str, Enum):
+    SELF = "self"
+    TURNSTILE = "turnstile"
+
+class CheckinRequest(BaseModel):
+    gate: Optional[str] = Field(None, max_length=50)
+
+class TurnstileCheckinRequest(BaseModel):
+    user_id: str
+    gate: str = Field(..., max_length=50)
+
+class CheckinResponse(BaseModel):
+    message: str = "Check-in recorded"
+    user_id: str
+    membership_id: str
+    membership_end_date: datetime
+    checked_in_at: datetime
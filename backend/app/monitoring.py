@@ -0,0 +1,287 @@
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from pymongo import monitoring
+
+from app.cache import TTLCache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE_COMMANDS = frozenset({"find", "aggregate", "count", "distinct"})
+
+
+class CommandRecord:
+    __slots__ = (
+        "command_name",
+        "database",
+        "collection",
+        "duration_ms",
+        "docs_returned",
+        "docs_examined",
+        "collscan",
+        "command",
+    )
+
+    def __init__(self, command_name: str, database: str, collection: Optional[str], command: Optional[dict]):
+        self.command_name = command_name
+        self.database = database
+        self.collection = collection
+        self.command = command
+        self.duration_ms = 0.0
+        self.docs_returned: Optional[int] = None
+        self.docs_examined: Optional[int] = None
+        self.collscan: Optional[bool] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "command": self.command_name,
+            "collection": self.collection,
+            "duration_ms": round(self.duration_ms, 3),
+            "docs_returned": self.docs_returned,
+            "docs_examined": self.docs_examined,
+            "collscan": self.collscan,
+        }
+
+
+class RequestQueryStats:
+    """Mongo commands issued while serving one request."""
+
+    __slots__ = ("count", "duration_ms", "commands", "path")
+
+    def __init__(self, path: Optional[str] = None):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.commands: list[CommandRecord] = []
+        self.path = path
+
+
+_request_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar(
+    "request_query_stats", default=None
+)
+
+
+def current_query_stats() -> Optional[RequestQueryStats]:
+    return _request_query_stats.get()
+
+
+@contextmanager
+def track_queries(path: Optional[str] = None) -> Iterator[RequestQueryStats]:
+    """
+    Record the Mongo commands issued inside the block. Nested blocks share
+    the outermost record, so a test can wrap a request and read the total.
+    """
+    stats = _request_query_stats.get()
+    if stats is not None:
+        yield stats
+        return
+    stats = RequestQueryStats(path)
+    token = _request_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _request_query_stats.reset(token)
+
+
+def _returned_docs(reply: dict) -> Optional[int]:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+        if batch is not None:
+            return len(batch)
+    if "n" in reply:
+        return reply["n"]
+    return None
+
+
+def _explainable(command_name: str, command: dict) -> Optional[dict]:
+    if command_name not in EXPLAINABLE_COMMANDS:
+        return None
+    return {
+        key: value for key, value in command.items()
+        if not key.startswith("$") and key not in ("lsid", "txnNumber")
+    }
+
+
+def _query_shape(value):
+    """
+    The structure of a filter with its values blanked out, so queries that
+    differ only in their arguments share a shape.
+    """
+    if isinstance(value, dict):
+        return tuple((key, _query_shape(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_query_shape(item) for item in value)
+    return "?"
+
+
+def _shape_key(record: "CommandRecord") -> tuple:
+    command = record.command or {}
+    return (
+        record.command_name,
+        record.database,
+        record.collection,
+        _query_shape(command.get("filter", command.get("query"))),
+        _query_shape(command.get("pipeline")),
+        _query_shape(command.get("sort")),
+    )
+
+
+class QueryCounter(monitoring.CommandListener):
+    """
+    Attributes every command to the request in whose context it was issued.
+    Motor copies the caller's context into its executor threads, so the
+    contextvar set by the middleware is visible here.
+    """
+
+    def __init__(self):
+        self._pending: dict[tuple, tuple[RequestQueryStats, CommandRecord]] = {}
+        self.slow_commands = 0
+        self.collscans = 0
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        stats = _request_query_stats.get()
+        if stats is None:
+            return
+        stats.count += 1
+        collection = event.command.get(event.command_name)
+        record = CommandRecord(
+            event.command_name,
+            event.database_name,
+            collection if isinstance(collection, str) else None,
+            _explainable(event.command_name, event.command)
+        )
+        stats.commands.append(record)
+        self._pending[(event.connection_id, event.request_id)] = (stats, record)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        stats, record = pending
+        record.duration_ms = event.duration_micros / 1000
+        record.docs_returned = _returned_docs(event.reply)
+        stats.duration_ms += record.duration_ms
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is not None:
+            stats, record = pending
+            record.duration_ms = event.duration_micros / 1000
+            stats.duration_ms += record.duration_ms
+
+
+query_counter = QueryCounter()
+
+
+def _has_collscan(plan: dict) -> bool:
+    if plan.get("stage") == "COLLSCAN":
+        return True
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    return any(_has_collscan(child) for child in children)
+
+
+async def explain_command(record: CommandRecord) -> None:
+    """
+    Fill in COLLSCAN, and docs examined when the verbosity executes the
+    plan, for a recorded command by running it through ``explain``. Runs
+    outside any request's query accounting.
+    """
+    from app.db import client
+
+    _request_query_stats.set(None)
+    if client is None or record.command is None:
+        return
+    try:
+        explained = await client[record.database].command(
+            {"explain": record.command, "verbosity": settings.MONGO_EXPLAIN_VERBOSITY}
+        )
+    except Exception as e:
+        logger.debug("Could not explain %s on %s: %s", record.command_name, record.collection, e)
+        return
+    execution = explained.get("executionStats", {})
+    record.docs_examined = execution.get("totalDocsExamined")
+    planner = explained.get("queryPlanner", {})
+    winning_plan = planner.get("winningPlan", {})
+    record.collscan = _has_collscan(winning_plan.get("queryPlan", winning_plan))
+    if record.collscan:
+        query_counter.collscans += 1
+        logger.warning(
+            "COLLSCAN: %s on %s examined %s docs to return %s",
+            record.command_name, record.collection, record.docs_examined, record.docs_returned
+        )
+
+
+_explain_tasks: set[asyncio.Task] = set()
+# Query shapes explained recently; each shape is explained at most once per
+# interval, so a hot slow query does not run its explain on every request.
+_explained_shapes = TTLCache(maxsize=1024, ttl=settings.MONGO_EXPLAIN_INTERVAL_SECONDS)
+
+
+def _schedule_explain(record: CommandRecord) -> None:
+    if len(_explain_tasks) >= settings.MONGO_EXPLAIN_MAX_CONCURRENT:
+        return
+    shape = _shape_key(record)
+    if _explained_shapes.get(shape):
+        return
+    _explained_shapes.set(shape, True)
+    task = asyncio.create_task(explain_command(record))
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+def _report(stats: RequestQueryStats) -> None:
+    explain_mode = settings.MONGO_EXPLAIN_MODE
+    repeated: dict[tuple, int] = {}
+    for record in stats.commands:
+        if record.command is not None:
+            key = (record.command_name, record.collection, repr(record.command.get("filter")))
+            repeated[key] = repeated.get(key, 0) + 1
+        slow = record.duration_ms >= settings.MONGO_SLOW_QUERY_MS
+        if slow:
+            query_counter.slow_commands += 1
+            logger.warning(
+                "Slow Mongo %s on %s took %.1fms (%s)",
+                record.command_name, record.collection, record.duration_ms, stats.path
+            )
+        if record.command is not None and (explain_mode == "all" or (explain_mode == "slow" and slow)):
+            _schedule_explain(record)
+    for (command_name, collection, query), count in repeated.items():
+        if count > 1:
+            logger.warning(
+                "Repeated Mongo %s on %s with filter %s ran %d times in %s",
+                command_name, collection, query, count, stats.path
+            )
+
+
+class QueryTrackingMiddleware:
+    """
+    ASGI middleware that gives each HTTP request its own query record,
+    optionally reports it in an ``X-Mongo-Queries`` response header, and
+    logs slow or unindexed commands once the request is done.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries(scope.get("path")) as stats:
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start" and settings.MONGO_DEBUG_HEADER:
+                    header = f"count={stats.count};time_ms={stats.duration_ms:.1f}"
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-mongo-queries", header.encode())
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                _report(stats)
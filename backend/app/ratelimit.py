@@ -0,0 +1,121 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rate(rate: str) -> tuple[int, int]:
+    """Parse a ``"<requests>/<seconds>"`` rule, e.g. ``"5/60"``."""
+    limit, window = rate.split("/")
+    return int(limit), int(window)
+
+
+class InMemoryBackend:
+    """
+    Per-process token buckets. The number of tracked keys is bounded; the
+    least recently used bucket is evicted first.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: int) -> Optional[float]:
+        """Take one token; return seconds to wait if the bucket is empty."""
+        now = time.monotonic()
+        refill_rate = limit / window
+        tokens, updated_at = self._buckets.pop(key, (float(limit), now))
+        tokens = min(float(limit), tokens + (now - updated_at) * refill_rate)
+        retry_after = None
+        if tokens < 1:
+            retry_after = (1 - tokens) / refill_rate
+        else:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    async def close(self) -> None:
+        self._buckets.clear()
+
+
+class RedisBackend:
+    """
+    Fixed-window counters in Redis, shared by every worker and host.
+    """
+
+    def __init__(self, url: str):
+        from redis import asyncio as redis
+
+        self._redis = redis.from_url(url)
+
+    async def hit(self, key: str, limit: int, window: int) -> Optional[float]:
+        now = time.time()
+        window_key = f"ratelimit:{key}:{int(now // window)}"
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.incr(window_key)
+            pipe.expire(window_key, window)
+            count, _ = await pipe.execute()
+        if count > limit:
+            return window - (now % window)
+        return None
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+class RateLimiter:
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.rejected = 0
+
+    async def check(
+        self,
+        scope: str,
+        *,
+        ip: str,
+        email: Optional[str] = None,
+        ip_rate: str,
+        email_rate: str
+    ) -> None:
+        """
+        Count one attempt against the caller's IP and, when given, the
+        target email. Raises a 429 as soon as either is over its limit.
+        """
+        if not self.enabled:
+            return
+        keys = [(f"{scope}:ip:{ip}", ip_rate)]
+        if email:
+            keys.append((f"{scope}:email:{email.strip().lower()}", email_rate))
+        for key, rate in keys:
+            limit, window = parse_rate(rate)
+            try:
+                retry_after = await self.backend.hit(key, limit, window)
+            except Exception:
+                # Never lock users out because the shared store is down
+                logger.exception("Rate limit backend failed")
+                return
+            if retry_after is not None:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many attempts. Please try again later.",
+                    headers={"Retry-After": str(math.ceil(retry_after))}
+                )
+
+
+rate_limiter = RateLimiter(
+    RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+    if settings.RATE_LIMIT_REDIS_URL
+    else InMemoryBackend(),
+    enabled=settings.RATE_LIMIT_ENABLED
+)
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_VERSION_ID = "principal_revocations"
+
+
+class RevocationFeed:
+    """
+    Cross-worker invalidation of cached auth state.
+
+    Changes that must take effect everywhere (revocations, deactivations,
+    role and membership changes) bump a version counter stored in
+    ``db.meta``. Every worker polls that single document and drops its
+    cached principals when the version moves, so a change reaches all
+    workers within one poll interval and this worker immediately.
+
+    The ids of revoked sessions are reloaded at the same time, so access
+    tokens bound to a revoked session are rejected without a query.
+    """
+
+    def __init__(self, on_change: Callable[[], None]):
+        self._on_change = on_change
+        self.version: Optional[int] = None
+        self.revoked_sessions: frozenset[str] = frozenset()
+
+    def is_session_revoked(self, session_id: Optional[str]) -> bool:
+        return session_id is not None and session_id in self.revoked_sessions
+
+    async def _read_version(self, db: AsyncIOMotorDatabase) -> int:
+        doc = await db.meta.find_one({"_id": REVOCATION_VERSION_ID})
+        return doc["version"] if doc else 0
+
+    async def load(self, db: AsyncIOMotorDatabase, version: Optional[int] = None) -> None:
+        # Read the version first, so a concurrent bump is picked up again on
+        # the next poll rather than missed.
+        if version is None:
+            version = await self._read_version(db)
+        sessions = await db.sessions.find({"revoked": True}, {"_id": 1}).to_list(None)
+        self.revoked_sessions = frozenset(str(session["_id"]) for session in sessions)
+        self._on_change()
+        self.version = version
+
+    async def refresh_if_stale(self, db: AsyncIOMotorDatabase) -> None:
+        version = await self._read_version(db)
+        if version != self.version:
+            await self.load(db, version)
+
+    async def bump(self, db: AsyncIOMotorDatabase) -> None:
+        """
+        Record a change for all workers and apply it to this one. Call it
+        after the change itself has been written.
+        """
+        doc = await db.meta.find_one_and_update(
+            {"_id": REVOCATION_VERSION_ID},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        await self.load(db, doc["version"])
+
+    async def watch(self, db: AsyncIOMotorDatabase, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh_if_stale(db)
+            except Exception:
+                logger.exception("Revocation feed refresh failed")
@@ -1,3 +1,6 @@
+import asyncio
+import base64
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any, Union
 
@@ -8,7 +11,7 @@ import re
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, List, Optional
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader
 from app.config import settings
 from fastapi import HTTPException, status
 from jose import jwt, JWTError
@@ -19,11 +22,37 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def signing_key(token_type: str) -> tuple[str, str]:
+    """Return the ``(kid, key)`` new tokens of this type are signed with."""
+    if token_type == "access_token":
+        return settings.ACCESS_TOKEN_KEY_ID, settings.ACCESS_TOKEN_KEY
+    return settings.REFRESH_TOKEN_KEY_ID, settings.REFRESH_TOKEN_KEY
+
+def verification_key(token: str, token_type: str) -> str:
+    """
+    Pick the key to verify ``token`` with from its ``kid`` header: the current
+    key or one of the previous keys kept around during a rotation. Tokens
+    issued before key ids existed carry no ``kid`` and use the current key.
+    """
+    key_id, secret_key = signing_key(token_type)
+    if token_type == "access_token":
+        previous_keys = settings.ACCESS_TOKEN_PREVIOUS_KEYS
+    else:
+        previous_keys = settings.REFRESH_TOKEN_PREVIOUS_KEYS
+    token_key_id = jwt.get_unverified_header(token).get("kid")
+    if token_key_id is None or token_key_id == key_id:
+        return secret_key
+    if token_key_id in previous_keys:
+        return previous_keys[token_key_id]
+    raise JWTError(f"Unknown signing key id: {token_key_id}")
+
 def create_token(
     subject: Union[str, Any],
     expires_delta: timedelta = None,
     token_type: str = "access_token",
-    email: str = None
+    email: str = None,
+    token_version: int = 0,
+    extra_claims: Optional[dict] = None
 ) -> str:
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -36,32 +65,111 @@ def create_token(
         "exp": expire,
         "sub": str(subject),
         "type": token_type,
-        "email": email
+        "email": email,
+        "ver": token_version
     }
+    if extra_claims:
+        to_encode.update(extra_claims)
 
-    if token_type == "access_token":
-        secret_key = settings.ACCESS_TOKEN_KEY
-    else:
-        secret_key = settings.REFRESH_TOKEN_KEY
-
-    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=settings.ALGORITHM)
+    key_id, secret_key = signing_key(token_type)
+    encoded_jwt = jwt.encode(
+        to_encode,
+        secret_key,
+        algorithm=settings.ALGORITHM,
+        headers={"kid": key_id}
+    )
     return encoded_jwt
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+
+class PasswordHasher:
+    """
+    Runs bcrypt hashing and verification on a worker pool so the event
+    loop never blocks on it. At most ``max_concurrency`` jobs are handed to
+    the pool at once; the rest wait on a semaphore and are counted as queued.
+    """
+
+    def __init__(self, executor_type: str, workers: int, max_concurrency: int):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unknown password hash executor: {executor_type}")
+        self.executor_type = executor_type
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._executor: Executor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+
+    def _get_executor(self) -> Executor:
+        # Created lazily so that forked server workers each get their own pool
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash"
+                )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._semaphore = None
+
+
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY
+)
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
+
 def decode_token(token: str, token_type: str = "access_token") -> dict:
     try:
-        if token_type == "access_token":
-            secret_key = settings.ACCESS_TOKEN_KEY
-        else:
-            secret_key = settings.REFRESH_TOKEN_KEY
-        
-        # Add debug print statements
-        print(f"Token Type: {token_type}")
-        print(f"Secret Key Used: {secret_key}")
-        print(f"Token: {token}")
-        
+        secret_key = verification_key(token, token_type)
         decoded_token = jwt.decode(
             token, 
             secret_key, 
@@ -81,14 +189,74 @@ def decode_token(token: str, token_type: str = "access_token") -> dict:
         )
 
 
-def create_regex_in_condition(field: str, values: List[str]) -> dict:
-    """Create a MongoDB $in condition with regex for a given field."""
+def normalize_search_term(value: Optional[str]) -> str:
+    return (value or "").strip().lower()
+
+def build_search_fields(email: str, first_name: str, last_name: str) -> dict:
+    """Lowercased copies of the searchable user fields, stored under ``search``."""
     return {
-        field: {
-            '$in': [re.compile(f".*{re.escape(value)}.*", re.IGNORECASE) for value in values]
-        }
+        "email": normalize_search_term(email),
+        "first_name": normalize_search_term(first_name),
+        "last_name": normalize_search_term(last_name),
     }
 
+def create_prefix_condition(field: str, value: str) -> dict:
+    """
+    Create an anchored, case-sensitive prefix match on a normalized field,
+    which MongoDB can answer with an index range scan.
+    """
+    return {field: {"$regex": f"^{re.escape(normalize_search_term(value))}"}}
+
+
+SEARCH_EMAIL_INDEX = [("search.email", 1)]
+SEARCH_NAME_INDEX = [("search.first_name", 1), ("search.last_name", 1)]
+SEARCH_LAST_NAME_INDEX = [("search.last_name", 1)]
+
+def build_search_branches(terms: List[str]) -> List[tuple[dict, list[tuple[str, int]]]]:
+    """
+    Split a member search into ``(filter, index)`` branches: exact matches
+    first, then prefix matches. Each branch is an equality or anchored
+    prefix match on the leading fields of one index, sorted on (and hinted
+    to) that index, so it is answered by an index scan that stops at the
+    limit.
+    """
+    query = " ".join(terms)
+    branches = []
+    for match in (lambda field, value: {field: value}, create_prefix_condition):
+        branches.append((match("search.email", query), SEARCH_EMAIL_INDEX))
+        if len(terms) > 1:
+            branches += [
+                (
+                    {**match("search.first_name", terms[0]), **match("search.last_name", terms[1])},
+                    SEARCH_NAME_INDEX
+                ),
+                (
+                    {**match("search.first_name", terms[1]), **match("search.last_name", terms[0])},
+                    SEARCH_NAME_INDEX
+                ),
+            ]
+        else:
+            branches += [
+                (match("search.first_name", terms[0]), SEARCH_NAME_INDEX),
+                (match("search.last_name", terms[0]), SEARCH_LAST_NAME_INDEX),
+            ]
+    return branches
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    """Encode the last _id of a page as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(last_id.binary).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return ObjectId(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
 
 def parse_json_list(param: Optional[str]) -> Optional[List[str]]:
     if param:
@@ -103,55 +271,19 @@ class EmailData:
     html_content: str
     subject: str
 
-def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
-    template_str = (
-        Path(__file__).parent / "templates" / template_name
-    ).read_text()
-    html_content = Template(template_str).render(context)
-    return html_content
+EMAIL_TEMPLATES_DIR = Path(__file__).parent / "templates"
 
+email_templates = Environment(
+    loader=FileSystemLoader(EMAIL_TEMPLATES_DIR),
+    auto_reload=settings.EMAIL_TEMPLATES_AUTO_RELOAD,
+    cache_size=100
+)
 
-async def validate_refresh_token(db, refresh_token: str):
-    try:
-        # First, check token in database
-        token_record = await db.tokens.find_one({
-            "token": refresh_token,
-            "token_type": "refresh_token",
-            "is_blacklisted": False,
-            "expires": {"$gt": datetime.utcnow()}
-        })
-        
-        print("Token Record:", token_record)
-        
-        if not token_record:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired refresh token"
-            )
-        
-        # Try to decode the token
-        try:
-            payload = decode_token(refresh_token, token_type="refresh_token")
-            print("Decoded Payload:", payload)
-        except HTTPException as decode_error:
-            print(f"Token Decode Error: {decode_error.detail}")
-            raise
-        
-        # Extract user ID and find user
-        user_id = payload.get('sub')
-        user = await db.users.find_one({"_id": ObjectId(user_id)})
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        return user
-    
-    except Exception as e:
-        print(f"Validation Error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail=f"Could not validate credentials: {str(e)}"
-        )
+def precompile_email_templates() -> None:
+    """Compile every email template into the environment cache."""
+    for template_name in email_templates.list_templates(extensions=["html"]):
+        email_templates.get_template(template_name)
+
+def render_email_template(*, template_name: str, context: dict[str, Any]) -> str:
+    html_content = email_templates.get_template(template_name).render(context)
+    return html_content
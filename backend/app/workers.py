@@ -0,0 +1,14 @@
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker for gunicorn with uvloop and httptools required rather
+    than picked when available, and a lifespan failure stopping the worker.
+    """
+
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+    }
@@ -0,0 +1,71 @@
+"""
+Per-request cost of authenticating a bearer token: full JWT verification
+plus claim validation, the verified-token cache, and the whole
+``get_current_user`` dependency with warm token and principal caches.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_auth
+"""
+import asyncio
+import os
+import timeit
+from datetime import timedelta
+
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DATABASE", "benchmark")
+os.environ.setdefault("CLIENT_ORIGIN", "http://localhost:3000")
+os.environ.setdefault("DOMAIN", "localhost")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from bson import ObjectId
+
+from app.dependencies import get_current_user, principal_cache, verify_access_token
+from app.models.models import TokenPayload
+from app.utils import create_token, decode_token
+
+NUMBER = 10_000
+
+USER_ID = str(ObjectId())
+TOKEN = create_token(
+    subject=USER_ID,
+    expires_delta=timedelta(hours=1),
+    token_type="access_token",
+    email="member@example.com"
+)
+
+
+def uncached() -> TokenPayload:
+    return TokenPayload(**decode_token(TOKEN))
+
+
+def cached() -> TokenPayload:
+    return verify_access_token(TOKEN)
+
+
+def dependency() -> None:
+    async def run() -> None:
+        for _ in range(NUMBER):
+            await get_current_user(None, TOKEN)
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    principal_cache.set(USER_ID, {
+        "_id": ObjectId(USER_ID),
+        "email": "member@example.com",
+        "is_active": True,
+        "is_verified": True,
+        "is_superuser": False,
+        "token_version": 0,
+    })
+    for label, fn in (("verify", uncached), ("cached", cached)):
+        best = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+        print(f"{label:>10}: {best / NUMBER * 1e6:8.1f} us/request")
+    best = min(timeit.repeat(dependency, number=1, repeat=5))
+    print(f"{'dependency':>10}: {best / NUMBER * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
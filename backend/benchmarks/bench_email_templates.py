@@ -0,0 +1,49 @@
+"""
+Render cost per OTP email: per-call file read + compile versus the cached
+Jinja environment used by app.utils.render_email_template.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_email_templates
+"""
+import os
+import timeit
+
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DATABASE", "benchmark")
+os.environ.setdefault("CLIENT_ORIGIN", "http://localhost:3000")
+os.environ.setdefault("DOMAIN", "localhost")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from jinja2 import Template
+
+from app.utils import (
+    EMAIL_TEMPLATES_DIR,
+    precompile_email_templates,
+    render_email_template,
+)
+
+CONTEXT = {"email": "member@example.com", "first_name": "Sam", "otp": "123456"}
+TEMPLATE_NAME = "signup_template.html"
+NUMBER = 2000
+
+
+def render_uncached() -> str:
+    template_str = (EMAIL_TEMPLATES_DIR / TEMPLATE_NAME).read_text()
+    return Template(template_str).render(CONTEXT)
+
+
+def render_cached() -> str:
+    return render_email_template(template_name=TEMPLATE_NAME, context=CONTEXT)
+
+
+def main() -> None:
+    precompile_email_templates()
+    assert render_uncached() == render_cached()
+    for label, fn in (("uncached", render_uncached), ("cached", render_cached)):
+        best = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+        print(f"{label:>9}: {best / NUMBER * 1e6:8.1f} us/email")
+
+
+if __name__ == "__main__":
+    main()
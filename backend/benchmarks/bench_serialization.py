@@ -0,0 +1,71 @@
+"""
+Per-request serialization cost of a 50-row admin user page: FastAPI's
+default path (response_model validation + jsonable_encoder + json.dumps)
+versus the trusted orjson path used by the admin list endpoints.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_serialization
+"""
+import json
+import os
+import timeit
+from datetime import datetime
+from typing import List
+
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DATABASE", "benchmark")
+os.environ.setdefault("CLIENT_ORIGIN", "http://localhost:3000")
+os.environ.setdefault("DOMAIN", "localhost")
+os.environ.setdefault("ENVIRONMENT", "benchmark")
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.models import AdminUserList
+from app.responses import ORJSONResponse
+
+NUMBER = 500
+
+PAGE = [
+    {
+        "_id": str(ObjectId()),
+        "first_name": f"First{i}",
+        "last_name": f"Last{i}",
+        "is_active": True,
+        "email": f"member{i}@example.com",
+        "profile": {
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+            "age": 30,
+            "height": 180.0,
+            "weight": 80.0,
+            "fitness_goals": ["Muscle Gain (hypertrophy)"],
+            "updated": datetime(2024, 1, 1),
+        },
+    }
+    for i in range(50)
+]
+
+page_adapter = TypeAdapter(List[AdminUserList])
+
+
+def default_path() -> bytes:
+    validated = page_adapter.validate_python(PAGE)
+    content = jsonable_encoder(page_adapter.dump_python(validated, by_alias=True))
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def trusted_path() -> bytes:
+    return ORJSONResponse(PAGE).body
+
+
+def main() -> None:
+    for label, fn in (("default", default_path), ("trusted", trusted_path)):
+        best = min(timeit.repeat(fn, number=NUMBER, repeat=5))
+        print(f"{label:>8}: {best / NUMBER * 1e6:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Load test for the auth and admin APIs.
+
+Boots the FastAPI app in-process against a local mongod, seeds a dedicated
+database with N users and drives the endpoints concurrently through
+httpx's ASGI transport. For every endpoint it reports p50/p95/p99 latency,
+throughput and Mongo commands per request, and writes the results as JSON
+so runs can be compared between commits.
+
+Run from the backend directory:
+
+    python -m benchmarks.load_test --sizes 1000,100000,1000000
+
+The target database (default ``uhfc_benchmark``) is dropped and reseeded
+whenever its user count does not match the requested size.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PASSWORD = "Benchmark123"
+ADMIN_EMAIL = "admin@benchmark.local"
+SEED_BATCH_SIZE = 10_000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000",
+                        help="comma separated user counts to seed, e.g. 1000,100000,1000000")
+    parser.add_argument("--requests", type=int, default=2000,
+                        help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--database", default="uhfc_benchmark")
+    parser.add_argument("--output", default=None,
+                        help="JSON results path, defaults to benchmarks/results/<commit>.json")
+    return parser.parse_args()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(pct / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+async def seed(db, size: int) -> None:
+    from app.db import backfill_search_fields, ensure_indexes
+    from app.utils import get_password_hash, build_search_fields
+
+    if await db.users.estimated_document_count() == size + 1:
+        return
+    await db.client.drop_database(db.name)
+    await ensure_indexes(db)
+
+    plan = await db.memberships.insert_one({
+        "name": "Gold",
+        "description": "Benchmark plan",
+        "price": 50.0,
+        "duration_months": 12,
+        "benefits": [],
+    })
+    hashed_password = get_password_hash(PASSWORD)
+    now = datetime.utcnow()
+
+    def user_doc(email: str, first_name: str, last_name: str, index: int, superuser: bool = False) -> dict:
+        doc = {
+            "email": email,
+            "hashed_password": hashed_password,
+            "profile": {"first_name": first_name, "last_name": last_name},
+            "search": build_search_fields(email, first_name, last_name),
+            "is_active": True,
+            "is_verified": True,
+            "is_superuser": superuser,
+            "is_new": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if index % 2 == 0:
+            doc["membership"] = {
+                "membership_id": str(plan.inserted_id),
+                "start_date": now,
+                "end_date": now + timedelta(days=360),
+            }
+        return doc
+
+    await db.users.insert_one(user_doc(ADMIN_EMAIL, "Admin", "Bench", 0, superuser=True))
+    for start in range(0, size, SEED_BATCH_SIZE):
+        await db.users.insert_many([
+            user_doc(f"member{i}@benchmark.local", f"First{i}", f"Last{i}", i)
+            for i in range(start, min(size, start + SEED_BATCH_SIZE))
+        ], ordered=False)
+    await backfill_search_fields(db)
+
+
+async def drive(client, make_request, total: int, concurrency: int) -> dict:
+    from app.monitoring import track_queries
+
+    latencies: list[float] = []
+    query_counts: list[int] = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker(worker_id: int) -> None:
+        nonlocal errors
+        state: dict = {}
+        for _ in remaining:
+            with track_queries() as stats:
+                started = time.perf_counter()
+                response = await make_request(client, worker_id, state)
+                latencies.append(time.perf_counter() - started)
+            query_counts.append(stats.count)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": total / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mongo_queries_per_request": sum(query_counts) / len(query_counts),
+    }
+
+
+async def login(client, email: str) -> dict:
+    response = await client.post("/api/v1/auth/login", json={"email": email, "password": PASSWORD})
+    response.raise_for_status()
+    return response.json()
+
+
+async def run_size(app, db, size: int, args: argparse.Namespace) -> dict:
+    import httpx
+    from app.catalog import membership_catalog
+
+    await seed(db, size)
+    await membership_catalog.load(db)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        member_email = "member0@benchmark.local"
+        member_tokens = await login(client, member_email)
+        admin_tokens = await login(client, ADMIN_EMAIL)
+        member_headers = {"Authorization": f"Bearer {member_tokens['access_token']}"}
+        admin_headers = {"Authorization": f"Bearer {admin_tokens['access_token']}"}
+
+        async def login_request(client, worker_id, state):
+            email = f"member{worker_id % size}@benchmark.local"
+            return await client.post("/api/v1/auth/login", json={"email": email, "password": PASSWORD})
+
+        async def profile_request(client, worker_id, state):
+            return await client.get("/api/v1/auth/profile", headers=member_headers)
+
+        async def refresh_request(client, worker_id, state):
+            # Refresh tokens rotate, so each worker follows its own chain
+            if "refresh_token" not in state:
+                state["refresh_token"] = (await login(client, member_email))["refresh_token"]
+            response = await client.post(
+                "/api/v1/auth/refresh-token",
+                json={"refresh_token": state["refresh_token"]}
+            )
+            if response.status_code == 200:
+                state["refresh_token"] = response.json()["refresh_token"]
+            return response
+
+        async def admin_users_request(client, worker_id, state):
+            return await client.get("/api/v1/admin/users", headers=admin_headers)
+
+        endpoints = {
+            "POST /auth/login": login_request,
+            "GET /auth/profile": profile_request,
+            "POST /auth/refresh-token": refresh_request,
+            "GET /admin/users": admin_users_request,
+        }
+        results = {}
+        for name, make_request in endpoints.items():
+            results[name] = await drive(client, make_request, args.requests, args.concurrency)
+            print(
+                f"[{size} users] {name:<26} "
+                f"p50={results[name]['p50_ms']:.1f}ms p95={results[name]['p95_ms']:.1f}ms "
+                f"p99={results[name]['p99_ms']:.1f}ms rps={results[name]['throughput_rps']:.0f} "
+                f"queries/req={results[name]['mongo_queries_per_request']:.2f} "
+                f"errors={results[name]['errors']}"
+            )
+        return results
+
+
+async def main() -> None:
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["MONGO_DATABASE"] = args.database
+    os.environ.setdefault("CLIENT_ORIGIN", "http://localhost:3000")
+    os.environ.setdefault("DOMAIN", "localhost")
+    os.environ.setdefault("ENVIRONMENT", "benchmark")
+    # Every request comes from one client, which the limiter would throttle
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+
+    from app.db import get_database
+    from app.main import app
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "requests_per_endpoint": args.requests,
+        "concurrency": args.concurrency,
+        "datasets": {},
+    }
+    async with app.router.lifespan_context(app):
+        db = get_database()
+        for size in (int(value) for value in args.sizes.split(",")):
+            report["datasets"][str(size)] = await run_size(app, db, size, args)
+
+    output = Path(args.output or Path(__file__).parent / "results" / f"{report['commit']}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
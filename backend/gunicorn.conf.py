@@ -0,0 +1,53 @@
+"""
+Production server profile:
+
+    gunicorn app.main:app
+
+Workers default to one per CPU; override with WEB_CONCURRENCY. Running more
+than one worker requires SECRET_KEY, ACCESS_TOKEN_KEY and REFRESH_TOKEN_KEY
+to be set, otherwise settings refuse to load.
+
+Metrics are published by every worker into METRICS_DIR, a temporary
+directory unless set, and /metrics merges them.
+
+The app is imported once in the master and forked. Only import-time state
+is shared that way: the Mongo client, SMTP workers, password hash pool and
+caches are all created per worker, in the lifespan or on first use.
+"""
+import contextlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# Settings read this when the app is preloaded below
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# Each worker publishes its metrics here so /metrics can report all of them
+_own_metrics_dir = "METRICS_DIR" not in os.environ
+if _own_metrics_dir:
+    os.environ["METRICS_DIR"] = tempfile.mkdtemp(prefix="uhfc-metrics-")
+
+worker_class = "app.workers.ProductionUvicornWorker"
+preload_app = True
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+keepalive = int(os.getenv("KEEPALIVE", 5))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("TIMEOUT", 60))
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+accesslog = os.getenv("ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def child_exit(server, worker):
+    # Drop the metrics of a worker that died without cleaning up
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(os.environ["METRICS_DIR"], f"{worker.pid}.json"))
+
+
+def on_exit(server):
+    if _own_metrics_dir:
+        shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
@@ -0,0 +1,25 @@
+import os
+
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DATABASE", "uhfc_test")
+os.environ.setdefault("CLIENT_ORIGIN", "http://localhost:3000")
+os.environ.setdefault("DOMAIN", "localhost")
+os.environ.setdefault("ENVIRONMENT", "test")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+
+@pytest.fixture(scope="session")
+def mongo_client():
+    """A client for the local test mongod; tests needing it skip without one."""
+    client = MongoClient(os.environ["DATABASE_URL"], serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"MongoDB is not reachable at {os.environ['DATABASE_URL']}")
+    yield client
+    client.close()
@@ -0,0 +1,110 @@
+import asyncio
+import socket
+from email.mime.text import MIMEText
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller
+
+from app.mail import MailTransport
+
+
+class CollectingHandler:
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 Message accepted for delivery"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def message(to: str) -> MIMEText:
+    msg = MIMEText("<p>hello</p>", "html")
+    msg["From"] = "noreply@example.com"
+    msg["To"] = to
+    msg["Subject"] = "Test"
+    return msg
+
+
+def transport(port: int) -> MailTransport:
+    return MailTransport(
+        hostname="127.0.0.1",
+        port=port,
+        username=None,
+        password=None,
+        use_tls=False,
+        start_tls=False,
+        pool_size=1,
+        queue_size=10,
+        timeout=5
+    )
+
+
+@pytest.fixture
+def smtp_server():
+    handler = CollectingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+async def wait_for(condition, timeout: float = 5.0) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_messages_share_one_connection(smtp_server):
+    controller, handler = smtp_server
+
+    async def send():
+        mail = transport(controller.port)
+        await mail.start()
+        for i in range(3):
+            mail.enqueue(message(f"member{i}@example.com"))
+        await mail.stop()
+        return mail
+
+    mail = asyncio.run(send())
+    assert mail.sent == 3
+    assert mail.failed == 0
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [
+        [f"member{i}@example.com"] for i in range(3)
+    ]
+
+
+def test_dropped_connection_is_reopened(smtp_server):
+    controller, handler = smtp_server
+
+    async def send():
+        mail = transport(controller.port)
+        await mail.start()
+        mail.enqueue(message("first@example.com"))
+        await wait_for(lambda: mail.sent == 1)
+
+        # The server goes away and comes back while the worker holds its
+        # connection, as happens when an idle connection is timed out.
+        controller.stop()
+        controller.start()
+
+        mail.enqueue(message("second@example.com"))
+        await mail.stop()
+        return mail
+
+    mail = asyncio.run(send())
+    assert mail.sent == 2
+    assert mail.failed == 0
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [
+        ["first@example.com"], ["second@example.com"]
+    ]
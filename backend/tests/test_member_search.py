@@ -0,0 +1,107 @@
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.utils import build_search_branches, build_search_fields, normalize_search_term
+
+PREFIX_MATCHES = 300
+
+
+def plan_stages(plan: dict) -> set[str]:
+    stages = {plan["stage"]}
+    children = plan.get("inputStages") or ([plan["inputStage"]] if "inputStage" in plan else [])
+    for child in children:
+        stages |= plan_stages(child)
+    return stages
+
+
+@pytest.fixture(scope="module")
+def search_db(mongo_client):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.db import ensure_indexes
+
+    db = mongo_client[f"{os.environ['MONGO_DATABASE']}_search"]
+    mongo_client.drop_database(db.name)
+
+    async def create_indexes():
+        client = AsyncIOMotorClient(os.environ["DATABASE_URL"])
+        try:
+            await ensure_indexes(client[db.name])
+        finally:
+            client.close()
+
+    asyncio.run(create_indexes())
+
+    now = datetime.utcnow()
+
+    def user(email: str, first_name: str, last_name: str) -> dict:
+        return {
+            "email": email,
+            "profile": {"first_name": first_name, "last_name": last_name},
+            "search": build_search_fields(email, first_name, last_name),
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    db.users.insert_many([
+        user(f"member{i}@example.com", f"Jonathan{i:03d}", "Smith")
+        for i in range(PREFIX_MATCHES)
+    ] + [user("zed@example.com", "Jo", "Zed")])
+    yield db
+    mongo_client.drop_database(db.name)
+
+
+@pytest.mark.parametrize("q", ["jo", "jo zed", "member12", "smith"])
+def test_search_branches_are_index_served(search_db, q):
+    for condition, index in build_search_branches(normalize_search_term(q).split()):
+        explained = (
+            search_db.users.find(condition)
+            .sort(index)
+            .hint(index)
+            .limit(5)
+            .explain()
+        )
+        winning_plan = explained["queryPlanner"]["winningPlan"]
+        stages = plan_stages(winning_plan.get("queryPlan", winning_plan))
+        assert "IXSCAN" in stages, (condition, stages)
+        assert "COLLSCAN" not in stages, (condition, stages)
+        # Sorted on the index itself, so the scan stops at the limit
+        assert "SORT" not in stages, (condition, stages)
+
+
+def test_exact_match_is_not_crowded_out_by_prefix_matches(search_db):
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.dependencies import get_current_user, get_db
+    from app.main import app
+
+    async def search() -> httpx.Response:
+        client = AsyncIOMotorClient(os.environ["DATABASE_URL"])
+
+        async def test_db():
+            yield client[search_db.name]
+
+        app.dependency_overrides[get_db] = test_db
+        app.dependency_overrides[get_current_user] = lambda: {
+            "_id": ObjectId(),
+            "is_superuser": True,
+        }
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                return await http.get("/api/v1/admin/users/search", params={"q": "jo", "limit": 5})
+        finally:
+            app.dependency_overrides.clear()
+            client.close()
+
+    response = asyncio.run(search())
+    assert response.status_code == 200
+    results = response.json()
+    assert len(results) == 5
+    assert results[0]["email"] == "zed@example.com"
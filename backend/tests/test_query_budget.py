@@ -0,0 +1,94 @@
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+
+@pytest.fixture(scope="module")
+def budget_db(mongo_client):
+    db = mongo_client[f"{os.environ['MONGO_DATABASE']}_query_budget"]
+    mongo_client.drop_database(db.name)
+
+    now = datetime.utcnow()
+    membership_id = db.memberships.insert_one({
+        "name": "Monthly",
+        "description": "One month of access",
+        "price": 30.0,
+        "duration_months": 1,
+        "benefits": [],
+    }).inserted_id
+    user_id = db.users.insert_one({
+        "email": "member@example.com",
+        "profile": {"first_name": "Jo", "last_name": "Zed"},
+        "membership": {
+            "membership_id": membership_id,
+            "start_date": now,
+            "end_date": now + timedelta(days=30),
+        },
+        "is_active": True,
+        "is_verified": True,
+        "created_at": now,
+        "updated_at": now,
+    }).inserted_id
+    yield db, user_id
+    mongo_client.drop_database(db.name)
+
+
+def count_queries(db_name: str, principal: dict, path: str):
+    """
+    Request ``path`` as ``principal`` and return the response with the
+    Mongo commands it issued. Authentication is overridden, so only the
+    route's own queries are counted.
+    """
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    from app.catalog import membership_catalog
+    from app.dependencies import get_current_user, get_db
+    from app.main import app
+    from app.monitoring import query_counter, track_queries
+
+    async def request():
+        client = AsyncIOMotorClient(os.environ["DATABASE_URL"], event_listeners=[query_counter])
+
+        async def test_db():
+            yield client[db_name]
+
+        await membership_catalog.load(client[db_name])
+        app.dependency_overrides[get_db] = test_db
+        app.dependency_overrides[get_current_user] = lambda: principal
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                with track_queries() as stats:
+                    response = await http.get(path)
+            return response, stats
+        finally:
+            app.dependency_overrides.clear()
+            client.close()
+
+    return asyncio.run(request())
+
+
+def test_get_profile_issues_one_query(budget_db):
+    db, user_id = budget_db
+    principal = {"_id": user_id, "email": "member@example.com", "is_active": True}
+
+    response, stats = count_queries(db.name, principal, "/api/v1/auth/profile")
+
+    assert response.status_code == 200
+    assert response.json()["membership"]["membership_name"] == "Monthly"
+    assert stats.count == 1, [record.as_dict() for record in stats.commands]
+
+
+def test_admin_user_details_issue_one_query(budget_db):
+    db, user_id = budget_db
+    principal = {"_id": ObjectId(), "email": "admin@example.com", "is_superuser": True}
+
+    response, stats = count_queries(db.name, principal, f"/api/v1/admin/users/{user_id}")
+
+    assert response.status_code == 200
+    assert response.json()["subscription"]["membership_name"] == "Monthly"
+    assert stats.count == 1, [record.as_dict() for record in stats.commands]